@@ -0,0 +1,176 @@
+"""
+Diffusion d'une exécution à de nombreux spectateurs (mode cours).
+
+Le code est exécuté une seule fois ; chaque étape est sérialisée une seule
+fois en trame JSON puis envoyée telle quelle à tous les abonnés WebSocket.
+La position de l'enseignant est synchronisée chez tous les spectateurs, et
+un spectateur qui arrive en retard reçoit un instantané puis le flux.
+
+Les sessions et leurs canaux vivent dans le processus de l'API qui les a créées.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Set
+
+from .execution import run_execution
+from .models import ExecutionRequest
+
+logger = logging.getLogger(__name__)
+
+# Trames en attente par spectateur au-delà desquelles il est déconnecté
+SUBSCRIBER_QUEUE_SIZE = 1024
+
+# Les étapes sont publiées par paquets ; entre deux paquets, les spectateurs
+# ont SLOW_VIEWER_TIMEOUT secondes pour revenir sous la moitié de leur file.
+# Un paquet ne peut donc pas faire déborder la file d'un spectateur qui suit
+PUBLISH_CHUNK_SIZE = 64
+SLOW_VIEWER_TIMEOUT = 5.0
+DRAIN_POLL_INTERVAL = 0.005
+
+# Fin de flux : la session a été fermée
+CLOSED = None
+
+# Fin de flux : le spectateur, trop lent, a été déconnecté
+DROPPED = "dropped"
+
+
+def _terminate(queue: asyncio.Queue, sentinel: Optional[str]):
+    """Remplace les trames en attente d'un spectateur par un marqueur de fin de flux."""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(sentinel)
+
+
+class BroadcastSession:
+    """Session partagée : trames pré-sérialisées, position courante et abonnés."""
+
+    def __init__(self, request: ExecutionRequest):
+        self.broadcast_id = uuid.uuid4().hex
+        self.token = secrets.token_urlsafe(16)
+        self.request = request
+        self.status = "running"
+        self.position = 0
+        self.frames: List[str] = []
+        self.result_frame: Optional[str] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Abonne un spectateur. L'instantané est placé en tête de sa file dans
+        la même opération, pour ne perdre ni dupliquer aucune trame.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        queue.put_nowait(self.snapshot_message())
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def snapshot_message(self) -> str:
+        """Instantané pour un spectateur en retard, assemblé sans re-sérialiser les trames."""
+        return (
+            f'{{"type":"snapshot","status":{json.dumps(self.status)},'
+            f'"position":{self.position},'
+            f'"result":{self.result_frame or "null"},'
+            f'"frames":[{",".join(self.frames)}]}}'
+        )
+
+    def publish(self, message: str):
+        """Envoie un message déjà sérialisé à tous les abonnés."""
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Spectateur trop lent : on le déconnecte plutôt que de bloquer les autres
+                self.drop(queue)
+
+    def drop(self, queue: asyncio.Queue):
+        """Déconnecte un spectateur trop lent."""
+        logger.warning(f"Spectateur trop lent déconnecté de la diffusion {self.broadcast_id}")
+        self.subscribers.discard(queue)
+        _terminate(queue, DROPPED)
+
+    async def drain(self):
+        """
+        Attend que chaque spectateur ait consommé au moins la moitié de sa
+        file ; ceux qui n'y parviennent pas en SLOW_VIEWER_TIMEOUT secondes
+        sont déconnectés.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SLOW_VIEWER_TIMEOUT
+        while True:
+            behind = [queue for queue in self.subscribers if queue.qsize() > SUBSCRIBER_QUEUE_SIZE // 2]
+            if not behind:
+                return
+            if loop.time() >= deadline:
+                for queue in behind:
+                    self.drop(queue)
+                return
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+    def add_step(self, step_json: str):
+        frame = f'{{"type":"step","data":{step_json}}}'
+        self.frames.append(frame)
+        self.publish(frame)
+
+    def finish(self, result_json: Optional[str], status: str):
+        self.status = status
+        self.result_frame = result_json
+        self.publish(f'{{"type":"status","status":{json.dumps(status)},"result":{result_json or "null"}}}')
+
+    def seek(self, step: int):
+        """Déplace la position de l'enseignant et la synchronise chez tous les spectateurs."""
+        self.position = step
+        self.publish(f'{{"type":"position","step":{step}}}')
+
+    def close(self):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(CLOSED)
+            except asyncio.QueueFull:
+                _terminate(queue, CLOSED)
+        self.subscribers.clear()
+
+
+class BroadcastManager:
+    """Registre borné des sessions de diffusion."""
+
+    def __init__(self, max_sessions: int = 32):
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, BroadcastSession]" = OrderedDict()
+
+    def create(self, request: ExecutionRequest) -> BroadcastSession:
+        session = BroadcastSession(request)
+        self.sessions[session.broadcast_id] = session
+        while len(self.sessions) > self.max_sessions:
+            _, expired = self.sessions.popitem(last=False)
+            expired.close()
+        return session
+
+    def get(self, broadcast_id: str) -> BroadcastSession:
+        session = self.sessions.get(broadcast_id)
+        if session is None:
+            raise KeyError(broadcast_id)
+        return session
+
+    async def run(self, session: BroadcastSession):
+        """Exécute le code de la session une seule fois et publie ses étapes au fil de l'eau."""
+        try:
+            response = await run_execution(session.request)
+            for start in range(0, len(response.steps), PUBLISH_CHUNK_SIZE):
+                for step in response.steps[start:start + PUBLISH_CHUNK_SIZE]:
+                    session.add_step(step.model_dump_json())
+                # Laisse les spectateurs recevoir le paquet avant le suivant
+                await asyncio.sleep(0)
+                await session.drain()
+            session.finish(response.model_dump_json(exclude={"steps"}), response.status.value)
+        except Exception as e:
+            logger.error(f"Erreur lors de la diffusion {session.broadcast_id}: {str(e)}")
+            session.finish(None, "error")
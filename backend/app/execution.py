@@ -0,0 +1,63 @@
+"""
+Orchestration d'une exécution : exécuteur, visualisation et réponse.
+
+Ce module est partagé par l'API (exécution synchrone) et par les workers
+Celery (exécution asynchrone via les jobs).
+"""
+
+from .executors import PythonExecutor, JavaScriptExecutor, CExecutor
+from .models import ExecutionRequest, ExecutionResponse
+from .visualizer import CodeVisualizer
+
+# Initialisation des exécuteurs
+executors = {
+    "python": PythonExecutor(),
+    "javascript": JavaScriptExecutor(),
+    "c": CExecutor(),
+}
+
+visualizer = CodeVisualizer()
+
+
+async def run_execution(request: ExecutionRequest) -> ExecutionResponse:
+    """Exécute le code de la requête et construit la réponse complète."""
+    # Obtention de l'exécuteur approprié
+    executor = executors[request.language]
+
+    # Exécution du code avec traçage
+    execution_result = await executor.execute_with_trace(
+        code=request.code,
+        input_data=request.input_data,
+        timeout=request.timeout,
+        trace_mode=request.trace_mode.value,
+        memory_interval=request.memory_interval,
+        tracer_backend=request.tracer_backend.value,
+        session_id=request.session_id
+    )
+
+    # Génération de la visualisation
+    visualization_data = await visualizer.generate_visualization(
+        execution_result, request.language
+    )
+
+    # Construction de la réponse
+    return ExecutionResponse(
+        steps=execution_result.steps,
+        current_step=0,
+        total_steps=(
+            len(execution_result.step_lines)
+            if execution_result.step_lines is not None
+            else len(execution_result.steps)
+        ),
+        language=request.language,
+        code=request.code,
+        status=execution_result.status,
+        final_output=execution_result.output,
+        execution_time=execution_result.execution_time,
+        visualization=visualization_data,
+        trace_id=execution_result.trace_id,
+        step_lines=execution_result.step_lines,
+        profile=execution_result.profile,
+        memory=execution_result.memory,
+        resumed_steps=execution_result.resumed_steps
+    )
@@ -0,0 +1,505 @@
+"""
+Instrumentation de l'AST du code Python utilisateur.
+
+Alternative à `sys.settrace` : des appels de traçage explicites sont insérés
+aux frontières d'instructions et à l'entrée/sortie des fonctions du code
+utilisateur, si bien que l'interpréteur reste sur son chemin rapide.
+
+Les variables ne sont pas relues à chaque étape : après chaque instruction,
+seuls les noms qu'elle lie (connus statiquement grâce à l'AST) sont transmis
+au traceur, qui maintient une copie des variables de chaque frame.
+
+Les crochets insérés sont des globales du module exécuté :
+
+- `__pg_enter__(nom, ligne, arguments)` : entrée de fonction, retourne la frame
+- `__pg_line__(frame, ligne)` : début d'une instruction
+- `__pg_bind__(frame, **valeurs)` / `__pg_unbind__(frame, *noms)` : liaisons
+- `__pg_bind_global__(**valeurs)` / `__pg_unbind_global__(*noms)` : liaisons `global`
+- `__pg_leave__(frame, ligne, valeur)` : sortie de fonction, retourne la valeur
+- `__pg_loop__(frame, ligne, itérable)` : en-tête de boucle `for`
+- `__pg_cond__(frame, ligne)` : en-tête de boucle `while`
+- `__pg_suspend__(frame, ligne, valeur)` / `__pg_resume__(frame, ligne, envoi)` :
+  suspension et reprise d'un générateur autour de chaque `yield`
+
+Les variables libres d'une fonction et ses variables capturées par une
+fermeture sont lues à son entrée, à chaque affectation, et après chaque
+instruction contenant un appel (qui peut exécuter une fermeture les
+modifiant), comme dans `frame.f_locals`.
+
+Différences connues avec le traceur `sys.settrace` :
+
+- seul le code utilisateur est tracé, jamais celui des bibliothèques ;
+- les corps de classe, compréhensions, lambdas et lignes `case` ne
+  produisent pas d'étapes, et une expression sur plusieurs lignes produit
+  une seule étape ;
+- une variable partagée modifiée par une autre frame pendant un appel
+  n'est mise à jour qu'après l'instruction contenant cet appel ;
+- `yield from` et `await` ne sont pas découpés : les valeurs déléguées ne
+  produisent pas d'étapes de suspension et de reprise, et un générateur
+  fermé ou interrompu par `throw()` ne produit pas d'étape de reprise.
+"""
+
+import ast
+import symtable
+from typing import Dict, List, Optional, Set, Tuple
+
+FRAME_NAME = "__pg_f__"
+RETURN_NAME = "__pg_r__"
+MODULE_NAME = "<module>"
+
+ENTER_HOOK = "__pg_enter__"
+LINE_HOOK = "__pg_line__"
+BIND_HOOK = "__pg_bind__"
+UNBIND_HOOK = "__pg_unbind__"
+BIND_GLOBAL_HOOK = "__pg_bind_global__"
+UNBIND_GLOBAL_HOOK = "__pg_unbind_global__"
+LEAVE_HOOK = "__pg_leave__"
+LOOP_HOOK = "__pg_loop__"
+COND_HOOK = "__pg_cond__"
+SUSPEND_HOOK = "__pg_suspend__"
+RESUME_HOOK = "__pg_resume__"
+
+_FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+_SCOPE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+
+def _call(hook: str, *args: ast.expr, keywords: Optional[List[ast.keyword]] = None) -> ast.Call:
+    return ast.Call(func=ast.Name(id=hook, ctx=ast.Load()), args=list(args), keywords=keywords or [])
+
+
+def _frame() -> ast.Name:
+    return ast.Name(id=FRAME_NAME, ctx=ast.Load())
+
+
+def _target_names(target: ast.expr) -> List[str]:
+    """Noms liés par une cible d'affectation (les indices et attributs ne lient rien)."""
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [name for element in target.elts for name in _target_names(element)]
+    if isinstance(target, ast.Starred):
+        return _target_names(target.value)
+    return []
+
+
+def _pattern_names(pattern: ast.pattern) -> List[str]:
+    """Noms capturés par un motif `case`."""
+    names = []
+    for node in ast.walk(pattern):
+        if isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.append(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.append(node.rest)
+    return names
+
+
+def walrus_names(*nodes: ast.AST) -> List[str]:
+    """Noms liés par des expressions d'affectation (:=), hors lambdas."""
+    names = []
+    pending = list(nodes)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.NamedExpr):
+            names.append(node.target.id)
+        if not isinstance(node, ast.Lambda):
+            pending.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def bound_names(statement: ast.stmt) -> List[str]:
+    """Noms liés inconditionnellement par une instruction simple ou une définition."""
+    names: List[str] = []
+    if isinstance(statement, ast.Assign):
+        for target in statement.targets:
+            names.extend(_target_names(target))
+    elif isinstance(statement, (ast.AugAssign, ast.AnnAssign)):
+        if not isinstance(statement, ast.AnnAssign) or statement.value is not None:
+            names.extend(_target_names(statement.target))
+    elif isinstance(statement, (ast.Import, ast.ImportFrom)):
+        for alias in statement.names:
+            if alias.name != "*":
+                names.append(alias.asname or alias.name.split(".")[0])
+    elif isinstance(statement, _FUNCTION_TYPES + (ast.ClassDef,)):
+        names.append(statement.name)
+
+    # Dédoublonner en conservant l'ordre
+    return list(dict.fromkeys(names))
+
+
+def _header(statement: ast.stmt) -> List[ast.AST]:
+    """Expressions évaluées par l'en-tête d'une instruction composée."""
+    if isinstance(statement, (ast.If, ast.While)):
+        return [statement.test]
+    if isinstance(statement, (ast.For, ast.AsyncFor)):
+        return [statement.iter]
+    if isinstance(statement, (ast.With, ast.AsyncWith)):
+        return [item.context_expr for item in statement.items]
+    if isinstance(statement, ast.Match):
+        return [statement.subject]
+    return []
+
+
+_COMPOUND_TYPES = (
+    ast.If, ast.While, ast.For, ast.AsyncFor, ast.With, ast.AsyncWith, ast.Match, ast.Try,
+    getattr(ast, "TryStar", ast.Try),
+) + _SCOPE_TYPES
+
+
+def _declared_globals(function: ast.AST) -> Set[str]:
+    """Noms déclarés `global` dans le corps d'une fonction (hors fonctions imbriquées)."""
+    names: Set[str] = set()
+    pending = list(ast.iter_child_nodes(function))
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.Global):
+            names.update(node.names)
+        elif not isinstance(node, _SCOPE_TYPES):
+            pending.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _nested_frees(table: symtable.SymbolTable) -> Set[str]:
+    """Variables libres des fonctions imbriquées dans une table, à toute profondeur."""
+    names: Set[str] = set()
+    for child in table.get_children():
+        if child.get_type() == "function":
+            names.update(child.get_frees())
+        names.update(_nested_frees(child))
+    return names
+
+
+def closure_variables(code: str, filename: str = "<string>") -> Dict[Tuple[int, str], Tuple[List[str], List[str]]]:
+    """
+    Variables libres et variables de cellule (capturées par une fonction
+    imbriquée) de chaque fonction, indexées par (ligne du `def`, nom).
+    """
+    closures: Dict[Tuple[int, str], Tuple[List[str], List[str]]] = {}
+    pending = [symtable.symtable(code, filename, "exec")]
+    while pending:
+        table = pending.pop()
+        if table.get_type() == "function":
+            nested = _nested_frees(table)
+            free = sorted(name for name in table.get_frees() if not name.startswith("__"))
+            cells = sorted(
+                symbol.get_name() for symbol in table.get_symbols()
+                if symbol.is_local() and symbol.get_name() in nested
+            )
+            if free or cells:
+                closures[(table.get_lineno(), table.get_name())] = (free, cells)
+        pending.extend(table.get_children())
+    return closures
+
+
+class YieldInstrumenter(ast.NodeTransformer):
+    """
+    Entoure chaque `yield` d'un générateur des crochets de suspension et de
+    reprise, sans descendre dans les portées imbriquées.
+    """
+
+    def visit_Yield(self, node: ast.Yield) -> ast.expr:
+        self.generic_visit(node)
+        line = ast.Constant(node.lineno)
+        node.value = _call(SUSPEND_HOOK, _frame(), line, node.value or ast.Constant(None))
+        return ast.copy_location(_call(RESUME_HOOK, _frame(), line, node), node)
+
+    def _skip(self, node: ast.AST) -> ast.AST:
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = visit_Lambda = _skip
+
+
+class NonlocalHoister(ast.NodeTransformer):
+    """
+    Retire les déclarations `nonlocal` du corps d'une fonction (hors portées
+    imbriquées) en les remplaçant par `pass`, et collecte leurs noms pour
+    les déclarer en tête de fonction.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+
+    def visit_Nonlocal(self, node: ast.Nonlocal) -> ast.stmt:
+        self.names.extend(node.names)
+        return ast.copy_location(ast.Pass(), node)
+
+    def _skip(self, node: ast.AST) -> ast.AST:
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = visit_Lambda = _skip
+
+
+class StepInstrumenter:
+    """Réécrit un module pour y insérer les crochets de traçage."""
+
+    def __init__(self, closures: Optional[Dict[Tuple[int, str], Tuple[List[str], List[str]]]] = None):
+        # Noms déclarés `global` dans la fonction en cours d'instrumentation
+        self.global_names: Set[str] = set()
+        # Variables libres et de cellule des fonctions (voir `closure_variables`)
+        self.closures = closures or {}
+        # Variables de la fonction en cours partagées avec d'autres frames
+        self.shared_names: List[str] = []
+
+    def instrument_module(self, tree: ast.Module) -> ast.Module:
+        body = self.instrument_body(tree.body)
+        tree.body = self._framed_body(MODULE_NAME, 0, ast.Dict(keys=[], values=[]), body, [])
+        return ast.fix_missing_locations(tree)
+
+    def _framed_body(self, name: str, line: int, arguments: ast.expr, body: List[ast.stmt],
+                     prefix: List[ast.stmt]) -> List[ast.stmt]:
+        """Entoure un corps de l'entrée dans la frame et d'une sortie garantie."""
+        enter = ast.Assign(
+            targets=[ast.Name(id=FRAME_NAME, ctx=ast.Store())],
+            value=_call(ENTER_HOOK, ast.Constant(name), ast.Constant(line), arguments)
+        )
+        leave = ast.Expr(_call(LEAVE_HOOK, _frame(), ast.Constant(None), ast.Constant(None)))
+        guarded = ast.Try(body=body or [ast.Pass()], handlers=[], orelse=[], finalbody=[leave])
+        return prefix + [enter, guarded]
+
+    def instrument_function(self, function: ast.AST):
+        """Instrumente une fonction : entrée, étapes de son corps et sortie."""
+        outer_globals, outer_shared = self.global_names, self.shared_names
+        self.global_names = _declared_globals(function)
+        free_names, cell_names = self.closures.get((function.lineno, function.name), ([], []))
+        self.shared_names = free_names + cell_names
+
+        parameters = function.args
+        names = [argument.arg for argument in parameters.posonlyargs + parameters.args + parameters.kwonlyargs]
+        if parameters.vararg:
+            names.append(parameters.vararg.arg)
+        if parameters.kwarg:
+            names.append(parameters.kwarg.arg)
+        arguments = ast.Dict(
+            keys=[ast.Constant(name) for name in names],
+            values=[ast.Name(id=name, ctx=ast.Load()) for name in names]
+        )
+
+        # La docstring reste en tête pour que __doc__ soit conservé
+        body = function.body
+        prefix: List[ast.stmt] = []
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            prefix, body = body[:1], body[1:]
+
+        body = self.instrument_body([YieldInstrumenter().visit(statement) for statement in body])
+
+        if free_names:
+            # Les variables libres sont lues avant les déclarations `nonlocal` :
+            # celles-ci sont remontées en tête de fonction, sans changer leur portée
+            hoister = NonlocalHoister()
+            body = [hoister.visit(statement) for statement in body]
+            if hoister.names:
+                prefix.append(ast.Nonlocal(names=list(dict.fromkeys(hoister.names))))
+            prefix.extend(self._collect_free(arguments, free_names))
+            arguments = _frame()
+
+        first_line = function.decorator_list[0].lineno if function.decorator_list else function.lineno
+        function.body = self._framed_body(function.name, first_line, arguments, body, prefix)
+
+        self.global_names, self.shared_names = outer_globals, outer_shared
+
+    def _collect_free(self, arguments: ast.Dict, free_names: List[str]) -> List[ast.stmt]:
+        """
+        Ajoute les variables libres aux arguments (dans la variable de frame,
+        avant l'étape d'appel) ; une cellule encore vide est ignorée.
+        """
+        statements: List[ast.stmt] = [ast.Assign(targets=[ast.Name(id=FRAME_NAME, ctx=ast.Store())], value=arguments)]
+        for name in free_names:
+            statements.append(ast.Try(
+                body=[ast.Assign(
+                    targets=[ast.Subscript(value=_frame(), slice=ast.Constant(name), ctx=ast.Store())],
+                    value=ast.Name(id=name, ctx=ast.Load())
+                )],
+                handlers=[ast.ExceptHandler(type=ast.Name(id="NameError", ctx=ast.Load()), name=None,
+                                            body=[ast.Pass()])],
+                orelse=[], finalbody=[]
+            ))
+        return statements
+
+    def instrument_class(self, class_def: ast.ClassDef):
+        """Le corps d'une classe n'est pas tracé, mais ses méthodes le sont."""
+        for statement in class_def.body:
+            if isinstance(statement, _FUNCTION_TYPES):
+                self.instrument_function(statement)
+            elif isinstance(statement, ast.ClassDef):
+                self.instrument_class(statement)
+
+    def instrument_body(self, statements: List[ast.stmt]) -> List[ast.stmt]:
+        """Insère une étape avant chaque instruction et les liaisons après."""
+        instrumented: List[ast.stmt] = []
+        for statement in statements:
+            hook = self._line_hook(statement)
+            if hook is not None:
+                instrumented.append(ast.copy_location(hook, statement))
+            instrumented.extend(self.instrument_statement(statement))
+            if isinstance(statement, ast.Delete):
+                names = [name for target in statement.targets for name in _target_names(target)]
+                hooks = self._unbinding_hooks(names)
+            elif isinstance(statement, _COMPOUND_TYPES + (ast.Return,)):
+                hooks = self._binding_hooks(bound_names(statement))
+            else:
+                hooks = self._binding_hooks(
+                    bound_names(statement), walrus_names(statement) + self._refreshed_names(statement)
+                )
+            instrumented.extend(ast.copy_location(hook, statement) for hook in hooks)
+        return instrumented
+
+    def _refreshed_names(self, *nodes: ast.AST) -> List[str]:
+        """
+        Variables partagées à relire après `nodes` : un appel peut exécuter
+        une fermeture qui les modifie.
+        """
+        if self.shared_names and any(
+            isinstance(node, (ast.Call, ast.Await, ast.Yield, ast.YieldFrom))
+            for root in nodes for node in ast.walk(root)
+        ):
+            return self.shared_names
+        return []
+
+    def _line_hook(self, statement: ast.stmt) -> Optional[ast.stmt]:
+        # Les en-têtes de boucles produisent leurs étapes à chaque itération,
+        # et les déclarations de portée ne sont pas exécutées
+        if isinstance(statement, (ast.For, ast.While, ast.Global, ast.Nonlocal)):
+            return None
+        line = statement.lineno
+        if isinstance(statement, _FUNCTION_TYPES + (ast.ClassDef,)) and statement.decorator_list:
+            line = statement.decorator_list[0].lineno
+        return ast.Expr(_call(LINE_HOOK, _frame(), ast.Constant(line)))
+
+    def _split_scopes(self, names: List[str]):
+        local_names = [name for name in names if name not in self.global_names]
+        global_names = [name for name in names if name in self.global_names]
+        return local_names, global_names
+
+    def _binding_hooks(self, names: List[str], conditional: Optional[List[str]] = None) -> List[ast.stmt]:
+        """
+        Crochets transmettant au traceur les valeurs des noms liés. Les noms
+        `conditional` (expressions :=) peuvent ne pas avoir été liés.
+        """
+        hooks: List[ast.stmt] = []
+        for name in dict.fromkeys(conditional or []):
+            if name in names:
+                continue
+            hooks.append(ast.Try(
+                body=self._binding_hooks([name]),
+                handlers=[ast.ExceptHandler(type=ast.Name(id="NameError", ctx=ast.Load()), name=None,
+                                            body=[ast.Pass()])],
+                orelse=[], finalbody=[]
+            ))
+
+        local_names, global_names = self._split_scopes(names)
+        if local_names:
+            hooks.append(ast.Expr(_call(BIND_HOOK, _frame(), keywords=[
+                ast.keyword(arg=name, value=ast.Name(id=name, ctx=ast.Load())) for name in local_names
+            ])))
+        if global_names:
+            hooks.append(ast.Expr(_call(BIND_GLOBAL_HOOK, keywords=[
+                ast.keyword(arg=name, value=ast.Name(id=name, ctx=ast.Load())) for name in global_names
+            ])))
+        return hooks
+
+    def _unbinding_hooks(self, names: List[str]) -> List[ast.stmt]:
+        """Crochets signalant au traceur les noms supprimés."""
+        local_names, global_names = self._split_scopes(names)
+        hooks: List[ast.stmt] = []
+        if local_names:
+            hooks.append(ast.Expr(_call(UNBIND_HOOK, _frame(), *map(ast.Constant, local_names))))
+        if global_names:
+            hooks.append(ast.Expr(_call(UNBIND_GLOBAL_HOOK, *map(ast.Constant, global_names))))
+        return hooks
+
+    def _bound_body(self, names: List[str], body: List[ast.stmt], anchor: ast.AST,
+                    header: Optional[ast.stmt] = None) -> List[ast.stmt]:
+        """
+        Corps instrumenté, précédé des liaisons faites à son entrée (cible de
+        boucle, `as`...) et de celles des := de l'en-tête de `header`.
+        """
+        conditional = []
+        if header is not None:
+            conditional = walrus_names(*_header(header)) + self._refreshed_names(*_header(header))
+        hooks = [ast.copy_location(hook, anchor) for hook in self._binding_hooks(names, conditional)]
+        return hooks + self.instrument_body(body)
+
+    def instrument_statement(self, statement: ast.stmt) -> List[ast.stmt]:
+        """Instrumente les sous-corps d'une instruction composée."""
+        if isinstance(statement, _FUNCTION_TYPES):
+            self.instrument_function(statement)
+
+        elif isinstance(statement, ast.ClassDef):
+            self.instrument_class(statement)
+
+        elif isinstance(statement, ast.Return):
+            value = statement.value or ast.Constant(None)
+            refreshed = self._refreshed_names(value)
+            if refreshed:
+                # La valeur est calculée avant de relire les variables partagées
+                # qu'elle a pu modifier, puis l'étape de retour est produite
+                result = ast.copy_location(
+                    ast.Assign(targets=[ast.Name(id=RETURN_NAME, ctx=ast.Store())], value=value), statement
+                )
+                hooks = [ast.copy_location(hook, statement) for hook in self._binding_hooks([], refreshed)]
+                value = ast.copy_location(ast.Name(id=RETURN_NAME, ctx=ast.Load()), value)
+                statement.value = ast.copy_location(
+                    _call(LEAVE_HOOK, _frame(), ast.Constant(statement.lineno), value), value
+                )
+                return [result] + hooks + [statement]
+            statement.value = ast.copy_location(
+                _call(LEAVE_HOOK, _frame(), ast.Constant(statement.lineno), value), value
+            )
+
+        elif isinstance(statement, ast.For):
+            statement.iter = ast.copy_location(
+                _call(LOOP_HOOK, _frame(), ast.Constant(statement.lineno), statement.iter), statement.iter
+            )
+            statement.body = self._bound_body(_target_names(statement.target), statement.body, statement, statement)
+            statement.orelse = self._bound_body([], statement.orelse, statement, statement)
+
+        elif isinstance(statement, ast.AsyncFor):
+            statement.body = self._bound_body(_target_names(statement.target), statement.body, statement, statement)
+            statement.orelse = self._bound_body([], statement.orelse, statement, statement)
+
+        elif isinstance(statement, ast.While):
+            statement.test = ast.copy_location(ast.BoolOp(op=ast.And(), values=[
+                _call(COND_HOOK, _frame(), ast.Constant(statement.lineno)), statement.test
+            ]), statement.test)
+            statement.body = self._bound_body([], statement.body, statement, statement)
+            statement.orelse = self._bound_body([], statement.orelse, statement, statement)
+
+        elif isinstance(statement, ast.If):
+            statement.body = self._bound_body([], statement.body, statement, statement)
+            statement.orelse = self._bound_body([], statement.orelse, statement, statement)
+
+        elif isinstance(statement, (ast.With, ast.AsyncWith)):
+            names = [name for item in statement.items if item.optional_vars is not None
+                     for name in _target_names(item.optional_vars)]
+            # La sortie du bloc (__exit__) repasse par la ligne du `with`
+            exit_hook = ast.copy_location(
+                ast.Expr(_call(LINE_HOOK, _frame(), ast.Constant(statement.lineno))), statement
+            )
+            statement.body = [ast.copy_location(ast.Try(
+                body=self._bound_body(names, statement.body, statement, statement) or [ast.Pass()],
+                handlers=[], orelse=[], finalbody=[exit_hook]
+            ), statement)]
+
+        elif isinstance(statement, (ast.Try, getattr(ast, "TryStar", ast.Try))):
+            statement.body = self.instrument_body(statement.body)
+            for handler in statement.handlers:
+                hook = ast.copy_location(ast.Expr(_call(LINE_HOOK, _frame(), ast.Constant(handler.lineno))), handler)
+                names = [handler.name] if handler.name else []
+                handler.body = [hook] + self._bound_body(names, handler.body, handler)
+                # Python supprime le nom de l'exception à la fin du bloc `except`
+                handler.body.extend(ast.copy_location(hook, handler) for hook in self._unbinding_hooks(names))
+            statement.orelse = self.instrument_body(statement.orelse)
+            statement.finalbody = self.instrument_body(statement.finalbody)
+
+        elif isinstance(statement, ast.Match):
+            for case in statement.cases:
+                case.body = self._bound_body(_pattern_names(case.pattern), case.body, case.pattern, statement)
+
+        return [statement]
+
+
+def instrument(code: str, filename: str = "<string>"):
+    """Parse, instrumente et compile le code utilisateur."""
+    instrumenter = StepInstrumenter(closure_variables(code, filename))
+    tree = instrumenter.instrument_module(ast.parse(code, filename=filename))
+    return compile(tree, filename, "exec")
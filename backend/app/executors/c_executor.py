@@ -3,21 +3,71 @@ Exécuteur C utilisant GCC
 """
 
 import asyncio
+import json
+import re
 import tempfile
 import os
-from typing import Optional
-from ..models import ValidationResult, ValidationError
+from typing import Dict, List, Optional
+from ..models import ValidationResult, ValidationError, LineProfile, FunctionProfile, CallEdge, ProfileData
 from .python_executor import ExecutionResult
 
+# Ligne principale d'une entrée du graphe d'appels gprof :
+# [1]     60.0    0.03    0.02      25+35394   fib [1]
+GPROF_PRIMARY_RE = re.compile(
+    r'^\[\d+\]\s+[\d.]+\s+([\d.]+)\s+([\d.]+)\s+(?:[\d+]+\s+)?(\S.*?) \[\d+\]$'
+)
+# Ligne d'un appelant : "0.00    0.00      25/25          main [11]" ou "35394   fib [1]"
+GPROF_CALLER_RE = re.compile(
+    r'^\s+(?:[\d.]+\s+[\d.]+\s+)?(\d+)(?:\+\d+)?(?:/\d+)?\s+(\S.*?) \[\d+\]$'
+)
+
+
+def parse_gprof_call_graph(text: str):
+    """
+    Lit le graphe d'appels de `gprof -b -q` : temps cumulé et propre par
+    fonction, arcs appelant → appelé et temps total.
+    """
+    functions: Dict[str, tuple] = {}
+    call_edges: List[CallEdge] = []
+    total_time = 0.0
+
+    # Dans chaque entrée, les appelants précèdent la ligne principale
+    callers = []
+    for line in text.splitlines():
+        if line.startswith('-----'):
+            callers = []
+            continue
+        match = GPROF_PRIMARY_RE.match(line)
+        if match:
+            self_time, children_time, name = float(match.group(1)), float(match.group(2)), match.group(3)
+            functions[name] = (self_time + children_time, self_time)
+            total_time += self_time
+            for caller, calls in callers:
+                call_edges.append(CallEdge(caller=caller, callee=name, calls=calls))
+            callers = None
+            continue
+        match = GPROF_CALLER_RE.match(line)
+        if match and callers is not None:
+            callers.append((match.group(2), int(match.group(1))))
+
+    return functions, call_edges, total_time
+
 
 class CExecutor:
     """Exécuteur pour le code C."""
 
     def __init__(self):
         self.gcc_path = "gcc"
+        self.gcov_path = "gcov"
+        self.gprof_path = "gprof"
 
-    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30,
+                                 trace_mode: str = "full", memory_interval: Optional[int] = None,
+                                 tracer_backend: str = "settrace", session_id: Optional[str] = None) -> ExecutionResult:
         """Exécute le code C avec compilation et exécution."""
+        if trace_mode == "profile":
+            return await self.execute_with_profile(code, input_data, timeout)
+
         result = ExecutionResult()
 
         try:
@@ -94,6 +144,127 @@ class CExecutor:
 
         return result
 
+    async def execute_with_profile(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+        """
+        Exécute le code C instrumenté (gcov pour les passages par ligne, gprof
+        pour les temps et le graphe d'appels) et retourne son profil.
+        """
+        result = ExecutionResult()
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = os.path.join(work_dir, "program.c")
+            executable_path = os.path.join(work_dir, "program")
+            with open(source_path, "w") as source_file:
+                source_file.write(code)
+
+            try:
+                # Compiler avec l'instrumentation gcov et gprof
+                compile_process = await asyncio.create_subprocess_exec(
+                    self.gcc_path, '-O0', '-pg', '--coverage', '-o', executable_path, source_path,
+                    cwd=work_dir,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+
+                compile_stdout, compile_stderr = await compile_process.communicate()
+
+                if compile_process.returncode != 0:
+                    result.error = f"Erreur de compilation: {compile_stderr.decode()}"
+                    result.status = "error"
+                    return result
+
+                # Exécuter dans le répertoire de travail (gmon.out y est écrit)
+                execute_process = await asyncio.create_subprocess_exec(
+                    executable_path,
+                    cwd=work_dir,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    stdin=asyncio.subprocess.PIPE if input_data else None
+                )
+
+                input_bytes = input_data.encode() if input_data else None
+                stdout, stderr = await asyncio.wait_for(
+                    execute_process.communicate(input=input_bytes),
+                    timeout=timeout
+                )
+
+                if stdout:
+                    result.output = stdout.decode().strip().split('\n')
+
+                if stderr:
+                    result.error = stderr.decode()
+                    result.status = "error"
+
+                lines, calls = await self._collect_coverage(work_dir, source_path)
+                functions, call_edges, total_time = await self._collect_gprof(work_dir, executable_path)
+
+                result.profile = ProfileData(
+                    lines=lines,
+                    functions=[
+                        FunctionProfile(
+                            function_name=name,
+                            calls=count,
+                            total_time=functions.get(name, (None, None))[0],
+                            self_time=functions.get(name, (None, None))[1]
+                        )
+                        for name, count in calls.items()
+                    ],
+                    call_edges=call_edges,
+                    total_time=total_time
+                )
+
+            except asyncio.TimeoutError:
+                result.error = "Timeout d'exécution dépassé"
+                result.status = "error"
+            except Exception as e:
+                result.error = str(e)
+                result.status = "error"
+
+        return result
+
+    async def _collect_coverage(self, work_dir: str, source_path: str):
+        """Passages par ligne et appels par fonction, lus depuis gcov."""
+        process = await asyncio.create_subprocess_exec(
+            self.gcov_path, '--stdout', '--json-format', os.path.basename(source_path),
+            cwd=work_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await process.communicate()
+
+        lines: List[LineProfile] = []
+        calls: Dict[str, int] = {}
+        if process.returncode != 0 or not stdout:
+            return lines, calls
+
+        report = json.loads(stdout.decode())
+        for source in report.get("files", []):
+            if os.path.basename(source.get("file", "")) != os.path.basename(source_path):
+                continue
+            for line in source.get("lines", []):
+                if line["count"] > 0:
+                    lines.append(LineProfile(line=line["line_number"], hits=line["count"]))
+            for function in source.get("functions", []):
+                calls[function["name"]] = function["execution_count"]
+
+        lines.sort(key=lambda line: line.line)
+        return lines, calls
+
+    async def _collect_gprof(self, work_dir: str, executable_path: str):
+        """Temps cumulé et propre par fonction et graphe d'appels, lus depuis gprof."""
+        if not os.path.exists(os.path.join(work_dir, "gmon.out")):
+            return {}, [], 0.0
+
+        process = await asyncio.create_subprocess_exec(
+            self.gprof_path, '-b', '-q', executable_path, 'gmon.out',
+            cwd=work_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await process.communicate()
+
+        return parse_gprof_call_graph(stdout.decode())
+
     async def validate_syntax(self, code: str) -> ValidationResult:
         """Valide la syntaxe C en tentant une compilation."""
         result = ValidationResult(is_valid=True)
@@ -17,7 +17,9 @@ class JavaScriptExecutor:
     def __init__(self):
         self.node_path = "node"  # Chemin vers Node.js
 
-    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30,
+                                 trace_mode: str = "full", memory_interval: Optional[int] = None,
+                                 tracer_backend: str = "settrace", session_id: Optional[str] = None) -> ExecutionResult:
         """Exécute le code JavaScript avec traçage."""
         result = ExecutionResult()
 
@@ -1,12 +1,69 @@
+import __future__
 import ast
+import copy
 import sys
 import io
+import random
 import traceback
 import time
-from typing import List, Dict, Any, Optional
-from contextlib import redirect_stdout, redirect_stderr
+import tracemalloc
+import types
+import uuid
+from array import array
+from time import perf_counter
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager, nullcontext, redirect_stdout, redirect_stderr
 
-from ..models import ExecutionStep, StackFrame, Variable, ValidationResult, ValidationError
+from ..models import (
+    ExecutionStep, StackFrame, Variable, ValidationResult, ValidationError,
+    LineProfile, FunctionProfile, CallEdge, ProfileData,
+    StepMemory, AllocationSite, MemoryReport,
+)
+from ..trace_index import TraceIndex
+from . import ast_instrumenter
+
+# Nom de fichier sous lequel le code utilisateur est compilé par exec()
+USER_FILENAME = "<string>"
+
+# Nombre de sites d'allocation retournés dans le rapport mémoire
+TOP_ALLOCATION_SITES = 5
+
+# Fonctions d'horloge interceptées en mode replay
+CLOCK_FUNCTIONS = ("time", "time_ns", "perf_counter", "perf_counter_ns", "monotonic", "monotonic_ns")
+
+# Modules dont l'import empêche de reprendre une exécution à un point de contrôle
+EXTERNAL_EFFECT_MODULES = frozenset({
+    "os", "subprocess", "socket", "shutil", "pathlib", "tempfile", "urllib", "http",
+    "ctypes", "sqlite3", "threading", "multiprocessing", "signal", "asyncio", "importlib",
+    "builtins",
+})
+
+# Fonctions natives ayant des effets externes ou accédant à l'espace de noms lui-même
+EXTERNAL_EFFECT_CALLS = frozenset({
+    "open", "exec", "eval", "compile", "__import__", "globals", "locals", "vars", "breakpoint",
+})
+
+# Un point de contrôle n'est pris qu'après au moins CHECKPOINT_MIN_INTERVAL secondes
+# d'exécution, et au moins CHECKPOINT_COST_RATIO fois le coût de la copie précédente
+CHECKPOINT_MIN_INTERVAL = 0.01
+CHECKPOINT_COST_RATIO = 4
+
+# Mémoire maximale des points de contrôle d'une session d'édition (octets)
+MAX_CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+# Estimation de la mémoire d'une étape conservée : base et coût par variable (octets)
+STEP_BASE_BYTES = 1024
+STEP_VARIABLE_BYTES = 600
+
+# Types dont les valeurs sont immuables et ne référencent aucun autre objet
+_ATOMIC_TYPES = frozenset({int, float, complex, bool, str, bytes, type(None), range})
+
+# Types dont la valeur formatée ne change pas sans réaffectation de la variable
+_STABLE_FORMAT_TYPES = _ATOMIC_TYPES | {types.FunctionType, types.BuiltinFunctionType, types.ModuleType, type}
+
+# Drapeau des types créés par une instruction `class` (Py_TPFLAGS_HEAPTYPE)
+_HEAPTYPE = 1 << 9
 
 
 class ExecutionResult:
@@ -16,20 +73,41 @@ class ExecutionResult:
         self.status: str = "completed"
         self.execution_time: float = 0.0
         self.error: Optional[str] = None
+        self.trace_id: Optional[str] = None
+        self.step_lines: Optional[List[int]] = None
+        self.profile: Optional[ProfileData] = None
+        self.memory: Optional[MemoryReport] = None
+        self.resumed_steps: Optional[int] = None
 
 
 class PythonTracer:
     """Traceur pour capturer l'exécution pas-à-pas du code Python."""
 
-    def __init__(self):
+    def __init__(self, memory_interval: Optional[int] = None):
         self.steps = []
         self.current_step = 0
         self.output_buffer = []
         self.globals_dict = {}
         self.locals_dict = {}
+        self.index: Optional[TraceIndex] = TraceIndex()
+        # Mesure mémoire (tracemalloc) toutes les `memory_interval` étapes
+        self.memory_interval = memory_interval
+        self.memory_samples = 0
+        self.peak_memory = 0
+        self.allocation_sites: Dict[int, tuple] = {}
+        # Mémoire suivie au début du traçage, et mémoire retenue depuis par le
+        # traceur lui-même (étapes, index), exclues des mesures
+        self.memory_baseline: Optional[int] = None
+        self.tracer_memory = 0
+        # Mémoire suivie au début de l'étape en cours, rangée hors d'un objet int
+        # pour ne pas allouer d'objet qui survive à la mesure
+        self._traced = array('q', [0])
 
     def trace_calls(self, frame, event, arg):
         """Fonction de traçage appelée à chaque événement."""
+        if frame.f_code.co_filename == __file__:
+            # Ne pas tracer les fonctions internes de l'exécuteur (horloges du replay)
+            return None
         if event == 'line':
             self.capture_step(frame)
         elif event == 'call':
@@ -40,54 +118,133 @@ class PythonTracer:
 
     def capture_step(self, frame, is_call=False, is_return=False, return_value=None):
         """Capture l'état actuel de l'exécution."""
+        self.record_step(
+            frame.f_code.co_name, frame.f_lineno, frame.f_locals, frame.f_globals,
+            is_call, is_return, return_value
+        )
+
+    def record_step(self, function_name: str, line: int, local_values: Dict[str, Any], global_values: Dict[str, Any],
+                    is_call=False, is_return=False, return_value=None, local_cache=None, global_cache=None):
+        """
+        Enregistre une étape à partir des variables locales et globales d'une
+        frame. Les caches (voir `format_variables`) sont optionnels.
+        """
+        if not self.memory_interval:
+            self._record_step(function_name, line, local_values, global_values, is_call, is_return, return_value,
+                              local_cache, global_cache)
+            return
+
+        # La mémoire allouée pendant l'enregistrement (étape, index) est celle
+        # du traceur ; mesurée autour de l'appel, temporaires libérés compris
+        self._traced[0] = tracemalloc.get_traced_memory()[0]
+        self._record_step(function_name, line, local_values, global_values, is_call, is_return, return_value,
+                          local_cache, global_cache)
+        self.tracer_memory += tracemalloc.get_traced_memory()[0] - self._traced[0]
+
+    def _record_step(self, function_name: str, line: int, local_values: Dict[str, Any], global_values: Dict[str, Any],
+                     is_call=False, is_return=False, return_value=None, local_cache=None, global_cache=None):
         try:
             # Extraire les variables locales et globales
-            locals_vars = []
-            globals_vars = []
-
-            # Variables locales
-            for name, value in frame.f_locals.items():
-                if not name.startswith('__'):
-                    locals_vars.append(Variable(
-                        name=name,
-                        value=self.format_value(value),
-                        type=type(value).__name__,
-                        scope="local"
-                    ))
-
-            # Variables globales (seulement celles définies par l'utilisateur)
-            for name, value in frame.f_globals.items():
-                if not name.startswith('__') and name not in ['sys', 'traceback', 'io']:
-                    globals_vars.append(Variable(
-                        name=name,
-                        value=self.format_value(value),
-                        type=type(value).__name__,
-                        scope="global"
-                    ))
+            locals_vars = self.format_variables(local_values, "local", local_cache)
+            globals_vars = self.format_variables(global_values, "global", global_cache)
 
             # Créer le frame de pile
             stack_frame = StackFrame(
-                function_name=frame.f_code.co_name,
-                line=frame.f_lineno,
+                function_name=function_name,
+                line=line,
                 locals=locals_vars,
                 globals=globals_vars
             )
 
             # Créer l'étape d'exécution
             step = ExecutionStep(
-                line=frame.f_lineno,
+                line=line,
                 step=self.current_step,
                 stack=[stack_frame],
+                # Passé explicitement : la valeur par défaut serait copiée en profondeur
+                heap={},
                 output=self.output_buffer.copy()
             )
 
+            if self.memory_interval and self.current_step % self.memory_interval == 0:
+                step.memory = self.sample_memory(self._traced[0])
+
             self.steps.append(step)
             self.current_step += 1
 
+            if self.index is not None:
+                self.index.record_position(
+                    step.step, step.line, stack_frame.function_name,
+                    is_call, is_return, self.format_value(return_value) if is_return else None
+                )
+                self.index.record_variables(step.step, stack_frame)
+
         except Exception as e:
             # En cas d'erreur lors du traçage, on continue silencieusement
             pass
 
+    def format_variables(self, values: Dict[str, Any], scope: str,
+                         cache: Optional[Dict[str, Variable]] = None) -> List[Variable]:
+        """
+        Variables d'une portée (globales : seulement celles définies par
+        l'utilisateur). Avec un cache, les variables dont la valeur ne peut
+        changer sans réaffectation y sont conservées et réutilisées ; c'est à
+        l'appelant d'en retirer les noms réaffectés.
+        """
+        variables = []
+        for name, value in values.items():
+            if name.startswith('__') or (scope == "global" and name in ('sys', 'traceback', 'io')):
+                continue
+            variable = cache.get(name) if cache is not None else None
+            if variable is None:
+                variable = Variable(
+                    name=name,
+                    value=self.format_value(value),
+                    type=type(value).__name__,
+                    scope=scope
+                )
+                if cache is not None and type(value) in _STABLE_FORMAT_TYPES:
+                    cache[name] = variable
+            variables.append(variable)
+        return variables
+
+    def sample_memory(self, traced: Optional[int] = None) -> StepMemory:
+        """
+        Mesure la mémoire allouée par le programme : mémoire suivie par
+        tracemalloc depuis le début du traçage, moins celle du traceur. Le
+        coût ne dépend pas de la longueur de la trace.
+        """
+        if traced is None:
+            traced = tracemalloc.get_traced_memory()[0]
+        if self.memory_baseline is None:
+            self.memory_baseline = traced
+
+        allocated = max(0, traced - self.memory_baseline - self.tracer_memory)
+        self.peak_memory = max(self.peak_memory, allocated)
+        self.memory_samples += 1
+        return StepMemory(allocated_bytes=allocated, peak_bytes=self.peak_memory)
+
+    def memory_report(self) -> MemoryReport:
+        """
+        Construit le rapport mémoire final. Les sites d'allocation, encore
+        vivants en fin d'exécution, sont lus dans un unique instantané tracemalloc.
+        """
+        final = self.sample_memory()
+        # Regroupement par ligne puis sélection : `filter_traces` serait bien plus lent
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            if stat.traceback[0].filename == USER_FILENAME:
+                self.allocation_sites[stat.traceback[0].lineno] = (stat.size, stat.count)
+        top_sites = sorted(self.allocation_sites.items(), key=lambda item: item[1][0], reverse=True)
+        return MemoryReport(
+            final_bytes=final.allocated_bytes,
+            peak_bytes=self.peak_memory,
+            samples=self.memory_samples,
+            top_allocations=[
+                AllocationSite(line=line, size_bytes=size, count=count)
+                for line, (size, count) in top_sites[:TOP_ALLOCATION_SITES]
+            ]
+        )
+
     def format_value(self, value):
         """Formate une valeur pour l'affichage."""
         try:
@@ -103,16 +260,893 @@ class PythonTracer:
             return "<non-serializable>"
 
 
+class AstFrame:
+    """
+    Copie des variables d'une frame, tenue à jour par les crochets du backend
+    AST, avec les variables déjà formatées de ses portées locale et globale
+    (la seconde ne sert qu'à la frame du module).
+    """
+
+    __slots__ = ("function_name", "line", "variables", "closed", "formatted_locals", "formatted_globals")
+
+    def __init__(self, function_name: str, line: int, variables: Dict[str, Any]):
+        self.function_name = function_name
+        self.line = line
+        self.variables = variables
+        self.closed = False
+        self.formatted_locals: Dict[str, Variable] = {}
+        self.formatted_globals: Dict[str, Variable] = {}
+
+    def forget(self, names):
+        """Retire des caches les variables réaffectées ou supprimées."""
+        for name in names:
+            self.formatted_locals.pop(name, None)
+            self.formatted_globals.pop(name, None)
+
+
+class AstTracer(PythonTracer):
+    """
+    Backend de traçage par instrumentation de l'AST : les étapes sont produites
+    par les crochets insérés dans le code (voir `ast_instrumenter`), sans
+    `sys.settrace`. Le schéma des étapes est celui de `PythonTracer`.
+    """
+
+    def __init__(self, memory_interval: Optional[int] = None):
+        super().__init__(memory_interval=memory_interval)
+        self.module_frame: Optional[AstFrame] = None
+        # Fin du module : les crochets exécutés ensuite (générateurs fermés
+        # par le ramasse-miettes) ne produisent plus d'étapes, comme avec settrace
+        self.finished = False
+
+    def instrument(self, code: str):
+        """Compile le code utilisateur instrumenté."""
+        return ast_instrumenter.instrument(code, USER_FILENAME)
+
+    def hooks(self) -> Dict[str, Any]:
+        """Crochets à injecter dans les globales du code instrumenté."""
+        return {
+            ast_instrumenter.ENTER_HOOK: self.enter,
+            ast_instrumenter.LINE_HOOK: self.line,
+            ast_instrumenter.BIND_HOOK: self.bind,
+            ast_instrumenter.UNBIND_HOOK: self.unbind,
+            ast_instrumenter.BIND_GLOBAL_HOOK: self.bind_global,
+            ast_instrumenter.UNBIND_GLOBAL_HOOK: self.unbind_global,
+            ast_instrumenter.LEAVE_HOOK: self.leave,
+            ast_instrumenter.LOOP_HOOK: self.loop,
+            ast_instrumenter.COND_HOOK: self.cond,
+            ast_instrumenter.SUSPEND_HOOK: self.suspend,
+            ast_instrumenter.RESUME_HOOK: self.resume,
+        }
+
+    def _record(self, frame: AstFrame, is_call=False, is_return=False, return_value=None):
+        if self.finished:
+            return
+        self.record_step(
+            frame.function_name, frame.line, frame.variables, self.module_frame.variables,
+            is_call, is_return, return_value, frame.formatted_locals, self.module_frame.formatted_globals
+        )
+
+    def enter(self, function_name: str, line: int, arguments: Dict[str, Any]) -> AstFrame:
+        frame = AstFrame(function_name, line, arguments)
+        if self.module_frame is None:
+            self.module_frame = frame
+        self._record(frame, is_call=True)
+        return frame
+
+    def line(self, frame: AstFrame, line: int):
+        frame.line = line
+        self._record(frame)
+
+    def bind(self, frame: AstFrame, **values):
+        frame.variables.update(values)
+        frame.forget(values)
+
+    def unbind(self, frame: AstFrame, *names: str):
+        for name in names:
+            frame.variables.pop(name, None)
+        frame.forget(names)
+
+    def bind_global(self, **values):
+        self.module_frame.variables.update(values)
+        self.module_frame.forget(values)
+
+    def unbind_global(self, *names: str):
+        self.unbind(self.module_frame, *names)
+
+    def leave(self, frame: AstFrame, line: Optional[int], value: Any) -> Any:
+        # Appelé par `return` puis par le `finally` de la fonction : une seule étape
+        if not frame.closed:
+            frame.closed = True
+            if line is not None:
+                frame.line = line
+            self._record(frame, is_return=True, return_value=value)
+            self.finished = frame is self.module_frame
+        return value
+
+    def loop(self, frame: AstFrame, line: int, iterable):
+        """Itère en produisant l'étape de l'en-tête `for` avant chaque élément et à la sortie."""
+        iterator = iter(iterable)
+        while True:
+            self.line(frame, line)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            yield item
+
+    def cond(self, frame: AstFrame, line: int) -> bool:
+        """Produit l'étape de l'en-tête `while` avant chaque évaluation de la condition."""
+        self.line(frame, line)
+        return True
+
+    def suspend(self, frame: AstFrame, line: int, value: Any) -> Any:
+        """Un générateur cède une valeur : étape de retour, comme avec settrace."""
+        frame.line = line
+        self._record(frame, is_return=True, return_value=value)
+        return value
+
+    def resume(self, frame: AstFrame, line: int, sent: Any) -> Any:
+        """Un générateur reprend après `yield` : nouvelle étape d'appel."""
+        frame.line = line
+        self._record(frame, is_call=True)
+        return sent
+
+
+class ProfilingTracer:
+    """
+    Profileur par ligne du code utilisateur : nombre de passages, temps
+    cumulé (appels inclus) et temps propre de chaque ligne, plus les totaux
+    par fonction et le graphe d'appels. Aucun instantané n'est capturé.
+    """
+
+    def __init__(self):
+        self.line_hits: Dict[int, int] = {}
+        self.line_total: Dict[int, float] = {}
+        self.line_self: Dict[int, float] = {}
+        self.function_calls: Dict[str, int] = {}
+        self.function_total: Dict[str, float] = {}
+        self.function_self: Dict[str, float] = {}
+        self.call_edges: Dict[tuple, int] = {}
+        # Pile des frames actives : [nom, début, dernière ligne, instant de la
+        # dernière ligne, temps des appels depuis cette ligne, temps des appels total]
+        self.stack: List[list] = []
+        self.start_time = perf_counter()
+
+    def trace_calls(self, frame, event, arg):
+        """Fonction de traçage globale : ne suit que les frames du code utilisateur."""
+        if event != 'call' or frame.f_code.co_filename != USER_FILENAME:
+            return None
+
+        now = perf_counter()
+        name = frame.f_code.co_name
+        if self.stack:
+            edge = (self.stack[-1][0], name)
+            self.call_edges[edge] = self.call_edges.get(edge, 0) + 1
+        self.function_calls[name] = self.function_calls.get(name, 0) + 1
+        self.stack.append([name, now, None, now, 0.0, 0.0])
+        return self.trace_lines
+
+    def trace_lines(self, frame, event, arg):
+        """Fonction de traçage locale : chronomètre chaque ligne de la frame."""
+        if event == 'line':
+            now = perf_counter()
+            state = self.stack[-1]
+            self._flush_line(state, now)
+            line = frame.f_lineno
+            state[2] = line
+            state[3] = now
+            self.line_hits[line] = self.line_hits.get(line, 0) + 1
+        elif event == 'return':
+            now = perf_counter()
+            state = self.stack.pop()
+            self._flush_line(state, now)
+            name = state[0]
+            elapsed = now - state[1]
+            # En cas de récursion, le temps cumulé n'est compté qu'une fois
+            if not any(active[0] == name for active in self.stack):
+                self.function_total[name] = self.function_total.get(name, 0.0) + elapsed
+            self.function_self[name] = self.function_self.get(name, 0.0) + elapsed - state[5]
+            if self.stack:
+                self.stack[-1][4] += elapsed
+                self.stack[-1][5] += elapsed
+        return self.trace_lines
+
+    def _flush_line(self, state: list, now: float):
+        """Attribue le temps écoulé depuis le début de la ligne précédente."""
+        line = state[2]
+        if line is None:
+            return
+        delta = now - state[3]
+        self.line_total[line] = self.line_total.get(line, 0.0) + delta
+        self.line_self[line] = self.line_self.get(line, 0.0) + delta - state[4]
+        state[4] = 0.0
+
+    def get_profile(self) -> ProfileData:
+        """Construit le tableau compact par ligne et les totaux par fonction."""
+        return ProfileData(
+            lines=[
+                LineProfile(
+                    line=line,
+                    hits=hits,
+                    total_time=self.line_total.get(line, 0.0),
+                    self_time=self.line_self.get(line, 0.0)
+                )
+                for line, hits in sorted(self.line_hits.items())
+            ],
+            functions=[
+                FunctionProfile(
+                    function_name=name,
+                    calls=calls,
+                    total_time=self.function_total.get(name, 0.0),
+                    self_time=self.function_self.get(name, 0.0)
+                )
+                for name, calls in self.function_calls.items()
+            ],
+            call_edges=[
+                CallEdge(caller=caller, callee=callee, calls=calls)
+                for (caller, callee), calls in self.call_edges.items()
+            ],
+            total_time=perf_counter() - self.start_time
+        )
+
+
+class StopReplay(BaseException):
+    """Interrompt une ré-exécution dès que les étapes demandées sont capturées."""
+
+
+class NondeterminismLog:
+    """Journal des entrées non déterministes d'une exécution (stdin, horloges, graine aléatoire)."""
+
+    def __init__(self, input_data: Optional[str] = None):
+        self.input_data = input_data
+        self.seed = random.SystemRandom().getrandbits(64)
+        self.clock_values: List[float] = []
+
+
+@contextmanager
+def deterministic_environment(log: NondeterminismLog, replaying: bool = False):
+    """
+    Rend l'exécution reproductible : fixe la graine de `random` et enregistre
+    (ou rejoue) les valeurs retournées par les horloges du module `time`.
+    """
+    originals = {name: getattr(time, name) for name in CLOCK_FUNCTIONS}
+    random_state = random.getstate()
+    cursor = iter(log.clock_values)
+
+    def make_clock(original):
+        def clock():
+            if replaying:
+                value = next(cursor, None)
+                if value is not None:
+                    return value
+                return original()
+            value = original()
+            log.clock_values.append(value)
+            return value
+        return clock
+
+    for name, original in originals.items():
+        setattr(time, name, make_clock(original))
+    random.seed(log.seed)
+
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(time, name, original)
+        random.setstate(random_state)
+
+
+class RecordingTracer(PythonTracer):
+    """
+    Traceur du mode replay : n'enregistre que la ligne et la fonction de chaque
+    étape, sans instantané des variables (sauf pour les premières étapes).
+    """
+
+    def __init__(self, preview_steps: int = 1):
+        super().__init__()
+        self.preview_steps = preview_steps
+        self.lines = array('I')
+        self.function_ids = array('I')
+        self.function_names: List[str] = []
+        self._function_index: Dict[str, int] = {}
+
+    def capture_step(self, frame, is_call=False, is_return=False, return_value=None):
+        """Enregistre un point de contrôle léger pour l'étape courante."""
+        name = frame.f_code.co_name
+        index = self._function_index.get(name)
+        if index is None:
+            index = self._function_index[name] = len(self.function_names)
+            self.function_names.append(name)
+
+        self.lines.append(frame.f_lineno)
+        self.function_ids.append(index)
+
+        if self.current_step < self.preview_steps:
+            super().capture_step(frame, is_call, is_return, return_value)
+        else:
+            self.index.record_position(
+                self.current_step, frame.f_lineno, name,
+                is_call, is_return, self.format_value(return_value) if is_return else None
+            )
+            self.current_step += 1
+
+
+class ReplayTracer(PythonTracer):
+    """Traceur de ré-exécution : capture uniquement les étapes [start, stop)."""
+
+    def __init__(self, start: int, stop: int):
+        super().__init__()
+        self.start = start
+        self.stop = stop
+        # Les index sont construits lors de l'enregistrement, pas à la ré-exécution
+        self.index = None
+
+    def capture_step(self, frame, is_call=False, is_return=False, return_value=None):
+        """Compte les étapes et ne matérialise que celles de la fenêtre demandée."""
+        if self.current_step >= self.start:
+            super().capture_step(frame, is_call, is_return, return_value)
+        else:
+            self.current_step += 1
+
+        if self.current_step >= self.stop:
+            raise StopReplay()
+
+
+class ReplaySession:
+    """
+    Trace enregistrée en mode replay : les étapes sont matérialisées à la
+    demande en ré-exécutant le code de façon déterministe jusqu'à elles.
+    """
+
+    def __init__(self, code: str, log: NondeterminismLog, tracer: RecordingTracer, cache_size: int = 256):
+        self.code = code
+        self.log = log
+        self.lines = tracer.lines
+        self.function_ids = tracer.function_ids
+        self.function_names = tracer.function_names
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[int, ExecutionStep]" = OrderedDict()
+        for step in tracer.steps:
+            self.cache[step.step] = step
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.lines)
+
+    def materialize(self, start: int, count: int = 1) -> List[ExecutionStep]:
+        """Retourne les étapes [start, start + count), en ré-exécutant si nécessaire."""
+        if start < 0 or start >= self.total_steps:
+            raise IndexError(f"Étape hors limites: {start}")
+        stop = min(start + count, self.total_steps)
+
+        missing = [index for index in range(start, stop) if index not in self.cache]
+        if missing:
+            tracer = ReplayTracer(missing[0], missing[-1] + 1)
+            run_traced(self.code, tracer, self.log.input_data, self.log, replaying=True)
+            for step in tracer.steps:
+                self.cache[step.step] = step
+
+        steps = []
+        for index in range(start, stop):
+            step = self.cache.get(index)
+            if step is not None:
+                self.cache.move_to_end(index)
+                steps.append(step)
+
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return steps
+
+
+def run_traced(code: str, tracer, input_data: Optional[str] = None,
+               log: Optional[NondeterminismLog] = None, replaying: bool = False):
+    """
+    Exécute le code sous un traceur. Si un journal est fourni, l'exécution
+    se fait dans un environnement déterministe (voir `deterministic_environment`).
+    """
+    stdout_buffer = io.StringIO()
+    stderr_buffer = io.StringIO()
+    sys.stdin = io.StringIO(input_data or "")
+    environment = deterministic_environment(log, replaying) if log is not None else nullcontext()
+
+    try:
+        with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer), environment:
+            sys.settrace(tracer.trace_calls)
+            try:
+                exec_globals = {"__builtins__": __builtins__}
+                exec(code, exec_globals)
+            except StopReplay:
+                pass
+            except Exception:
+                if not replaying:
+                    raise
+            finally:
+                sys.settrace(None)
+    finally:
+        sys.stdin = sys.__stdin__
+
+    return stdout_buffer.getvalue(), stderr_buffer.getvalue()
+
+
+def future_flags(module: ast.Module) -> int:
+    """
+    Drapeaux de compilation des imports `from __future__` d'un module, à
+    transmettre à chacune de ses instructions compilées séparément.
+    """
+    flags = 0
+    for statement in module.body:
+        if not isinstance(statement, ast.ImportFrom) or statement.module != "__future__":
+            continue
+        for alias in statement.names:
+            feature = getattr(__future__, alias.name, None)
+            if isinstance(feature, __future__._Feature):
+                flags |= feature.compiler_flag
+    return flags
+
+
+def has_external_effects(statement: ast.stmt) -> bool:
+    """
+    Vrai si une instruction, y compris le corps des fonctions qu'elle définit,
+    peut agir hors des variables du programme (fichiers, processus, réseau...).
+    L'analyse est statique et volontairement conservatrice.
+    """
+    for node in ast.walk(statement):
+        if isinstance(node, ast.Import):
+            if any(alias.name.partition(".")[0] in EXTERNAL_EFFECT_MODULES for alias in node.names):
+                return True
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and (node.module or "").partition(".")[0] in EXTERNAL_EFFECT_MODULES:
+                return True
+        elif isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in EXTERNAL_EFFECT_CALLS:
+                return True
+    return False
+
+
+def mutates_module(statement: ast.stmt, namespace: Dict[str, Any]) -> bool:
+    """Vrai si une instruction affecte ou supprime un attribut d'un module importé."""
+    for node in ast.walk(statement):
+        if isinstance(node, ast.Attribute) and isinstance(node.ctx, (ast.Store, ast.Del)) \
+                and isinstance(node.value, ast.Name) \
+                and isinstance(namespace.get(node.value.id), types.ModuleType):
+            return True
+    return False
+
+
+def _is_dunder(name: str) -> bool:
+    return name.startswith("__") and name.endswith("__")
+
+
+def _is_code(value: Any) -> bool:
+    """Attributs de classe qui ne sont pas des données : ils ne sont pas copiés."""
+    return isinstance(value, (types.FunctionType, staticmethod, classmethod, property))
+
+
+class _EmptyCell:
+    """Marqueur d'une cellule de fermeture vide (une classe n'est jamais copiée)."""
+
+
+def shared_objects(values) -> Tuple[list, list, list, list]:
+    """
+    Fonctions et classes du code utilisateur, et modules, atteignables depuis
+    des valeurs. La copie profonde les partage au lieu de les copier : leur
+    état mutable est sauvegardé à part (voir `ProgramState`). Retourne aussi
+    les conteneurs dont tous les éléments sont atomiques, qu'une copie
+    superficielle suffit à copier.
+    """
+    functions, classes, modules, flat = [], [], [], []
+    seen = set()
+    pending = list(values)
+    while pending:
+        value = pending.pop()
+        kind = type(value)
+        if kind in _ATOMIC_TYPES or id(value) in seen:
+            continue
+        seen.add(id(value))
+
+        if isinstance(value, types.ModuleType):
+            modules.append(value)
+        elif kind is types.FunctionType:
+            if value.__code__.co_filename != USER_FILENAME:
+                continue
+            functions.append(value)
+            pending.extend(value.__defaults__ or ())
+            pending.extend((value.__kwdefaults__ or {}).values())
+            pending.extend(value.__dict__.values())
+            for cell in value.__closure__ or ():
+                try:
+                    pending.append(cell.cell_contents)
+                except ValueError:
+                    pass
+        elif isinstance(value, type):
+            if value.__flags__ & _HEAPTYPE and value.__module__ == "builtins":
+                classes.append(value)
+                pending.extend(value.__bases__)
+                pending.extend(vars(value).values())
+        elif isinstance(value, (staticmethod, classmethod)):
+            pending.append(value.__func__)
+        elif isinstance(value, property):
+            pending.extend((value.fget, value.fset, value.fdel))
+        elif kind in (list, tuple, set, frozenset):
+            # Les grands conteneurs de nombres ou de chaînes sont écartés sans boucle Python
+            if set(map(type, value)) <= _ATOMIC_TYPES:
+                flat.append(value)
+            else:
+                pending.extend(value)
+        elif kind is dict:
+            if set(map(type, value.values())) <= _ATOMIC_TYPES:
+                flat.append(value)
+            else:
+                pending.extend(value.values())
+        else:
+            pending.append(kind)
+            if hasattr(value, "__dict__"):
+                pending.extend(vars(value).values())
+    return functions, classes, modules, flat
+
+
+def _flat_copy(value):
+    """Copie d'un conteneur sans référence vers un objet mutable."""
+    return value if type(value) in (tuple, frozenset) else value.copy()
+
+
+class ProgramState:
+    """
+    État d'un programme à un point de contrôle : copie profonde des variables
+    globales et de l'état mutable des fonctions et classes du code utilisateur
+    (valeurs par défaut, attributs, cellules des fermetures, attributs de
+    classe), ainsi que l'état du générateur de `random`. Les fonctions,
+    classes et modules eux-mêmes sont partagés et non copiés.
+    """
+
+    def __init__(self, namespace: Dict[str, Any]):
+        started = perf_counter()
+        values = {name: value for name, value in namespace.items() if name != "__builtins__"}
+        functions, classes, self.modules, flat = shared_objects(values.values())
+
+        function_states = []
+        for function in functions:
+            cells = []
+            for cell in function.__closure__ or ():
+                try:
+                    cells.append(cell.cell_contents)
+                except ValueError:
+                    cells.append(_EmptyCell)
+            function_states.append(
+                (function, function.__defaults__, function.__kwdefaults__, dict(function.__dict__), cells)
+            )
+
+        # Méthodes et descripteurs ne sont pas copiables : seules les données le sont
+        class_data = []
+        self.class_code = []
+        for cls in classes:
+            attributes = {name: value for name, value in vars(cls).items() if not _is_dunder(name)}
+            class_data.append((cls, {name: value for name, value in attributes.items() if not _is_code(value)}))
+            self.class_code.append({name: value for name, value in attributes.items() if _is_code(value)})
+
+        memo = self._memo()
+        for value in flat:
+            memo[id(value)] = _flat_copy(value)
+        self.flat = [memo[id(value)] for value in flat]
+        self.state = copy.deepcopy((values, function_states, class_data), memo)
+        self.random_state = random.getstate()
+
+        # Mémoire ajoutée par la copie : les valeurs immuables sont partagées
+        self.size = sum(
+            sys.getsizeof(copied) for key, copied in memo.items()
+            if key != id(memo) and not isinstance(copied, types.ModuleType)
+        )
+        self.cost = perf_counter() - started
+
+    def _memo(self) -> Dict[int, Any]:
+        return {id(module): module for module in self.modules}
+
+    def restore(self, namespace: Dict[str, Any]):
+        """Restaure l'état dans `namespace`, qui reste le dictionnaire des globales des fonctions."""
+        memo = self._memo()
+        for value in self.flat:
+            memo[id(value)] = _flat_copy(value)
+        values, function_states, class_data = copy.deepcopy(self.state, memo)
+
+        namespace.clear()
+        namespace.update(values)
+
+        for function, defaults, kwdefaults, attributes, cells in function_states:
+            function.__defaults__ = defaults
+            function.__kwdefaults__ = kwdefaults
+            function.__dict__ = attributes
+            for cell, value in zip(function.__closure__ or (), cells):
+                if value is _EmptyCell:
+                    try:
+                        del cell.cell_contents
+                    except ValueError:
+                        pass
+                else:
+                    cell.cell_contents = value
+
+        for (cls, data), code in zip(class_data, self.class_code):
+            attributes = {**code, **data}
+            for name in [name for name in vars(cls) if not _is_dunder(name) and name not in attributes]:
+                delattr(cls, name)
+            for name, value in attributes.items():
+                setattr(cls, name, value)
+
+        random.setstate(self.random_state)
+
+
+class StatementTracer(PythonTracer):
+    """
+    Traceur du mode incrémental : les instructions de premier niveau sont
+    exécutées une à une, mais la trace reste celle d'une exécution d'un seul
+    tenant (un seul appel et un seul retour pour le module).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.statement_code = None
+        self.first_statement = True
+        self.last_statement = False
+        self.return_step: Optional[int] = None
+
+    def trace_calls(self, frame, event, arg):
+        if frame.f_code is self.statement_code:
+            if event == 'call' and not self.first_statement:
+                return self.trace_calls
+            if event == 'return':
+                if not self.last_statement:
+                    return self.trace_calls
+                self.return_step = self.current_step
+        return super().trace_calls(frame, event, arg)
+
+    @property
+    def boundary(self) -> int:
+        """Nombre d'étapes enregistrées, sans le retour final du module."""
+        return self.return_step if self.return_step is not None else self.current_step
+
+
+class Checkpoint:
+    """État d'une exécution après l'une de ses instructions de premier niveau."""
+
+    __slots__ = ("statement_count", "step_count", "output_size", "input_position", "elapsed", "state")
+
+    def __init__(self, statement_count: int, step_count: int, output_size: int, input_position: int,
+                 elapsed: float, state: ProgramState):
+        self.statement_count = statement_count
+        self.step_count = step_count
+        self.output_size = output_size
+        self.input_position = input_position
+        # Temps d'exécution des instructions qui précèdent le point de contrôle
+        self.elapsed = elapsed
+        self.state = state
+
+    @property
+    def benefit(self) -> float:
+        """Temps gagné en reprenant ici plutôt qu'au début (la restauration coûte une copie)."""
+        return self.elapsed - self.state.cost
+
+
+class IncrementalSession:
+    """
+    Dernière exécution d'une session d'édition, avec des points de contrôle
+    entre ses instructions de premier niveau. Un nouveau code qui partage un
+    préfixe d'instructions avec l'ancien reprend au point de contrôle le plus
+    avantageux de ce préfixe au lieu d'être ré-exécuté depuis le début.
+
+    Les points de contrôle sont espacés pour que leur coût reste une petite
+    fraction du temps d'exécution, et bornés en mémoire. Ils s'arrêtent à la
+    première instruction pouvant avoir des effets externes, modifiant un
+    module, ou dont l'état n'est pas copiable (générateur, fichier...).
+    """
+
+    def __init__(self, max_checkpoint_bytes: int = MAX_CHECKPOINT_BYTES):
+        self.max_checkpoint_bytes = max_checkpoint_bytes
+        self.statements: List[str] = []
+        self.input_data: Optional[str] = None
+        self.checkpoints: List[Checkpoint] = []
+        self.steps: List[ExecutionStep] = []
+        self.index = TraceIndex()
+        self.output = ""
+        self.namespace: Dict[str, Any] = {}
+
+    @property
+    def checkpoint_bytes(self) -> int:
+        return sum(checkpoint.state.size for checkpoint in self.checkpoints)
+
+    @property
+    def size(self) -> int:
+        """Estimation de la mémoire conservée : points de contrôle, étapes et index de la dernière exécution."""
+        variables = 0
+        if self.steps and self.steps[-1].stack:
+            frame = self.steps[-1].stack[0]
+            variables = len(frame.locals) + len(frame.globals)
+        return self.checkpoint_bytes + self.index.size \
+            + len(self.steps) * (STEP_BASE_BYTES + variables * STEP_VARIABLE_BYTES)
+
+    def resume_point(self, statements: List[str], input_data: Optional[str] = None) -> Optional[Checkpoint]:
+        """Point de contrôle d'où reprendre l'exécution de `statements`, s'il y en a un avantageux."""
+        if input_data != self.input_data:
+            return None
+        shared = 0
+        for old, new in zip(self.statements, statements):
+            if old != new:
+                break
+            shared += 1
+        # La dernière instruction est toujours exécutée, pour tracer le retour du module
+        limit = min(shared, len(statements) - 1)
+
+        best = None
+        for checkpoint in self.checkpoints:
+            if checkpoint.statement_count > limit:
+                break
+            if checkpoint.benefit > 0 and (best is None or checkpoint.benefit > best.benefit):
+                best = checkpoint
+        return best
+
+    def run(self, code: str, input_data: Optional[str] = None) -> Tuple[str, str, int]:
+        """
+        Exécute le code en reprenant au point de contrôle le plus avantageux.
+        Retourne la sortie standard, la sortie d'erreur et le nombre d'étapes reprises.
+        """
+        module = ast.parse(code, USER_FILENAME)
+        # Les positions font partie de la comparaison : les étapes reprises portent des numéros de ligne
+        statements = [ast.dump(statement, include_attributes=True) for statement in module.body]
+        checkpoint = self.resume_point(statements, input_data)
+        flags = future_flags(module)
+
+        tracer = StatementTracer()
+        stdin = io.StringIO(input_data or "")
+        stdout_buffer = io.StringIO()
+        stderr_buffer = io.StringIO()
+        start = 0
+        elapsed = 0.0
+
+        if checkpoint is not None:
+            start = checkpoint.statement_count
+            elapsed = checkpoint.elapsed
+            tracer.steps = self.steps[:checkpoint.step_count]
+            tracer.current_step = checkpoint.step_count
+            tracer.index = self.index.truncated(checkpoint.step_count)
+            tracer.first_statement = False
+            stdout_buffer.write(self.output[:checkpoint.output_size])
+            stdin.seek(checkpoint.input_position)
+            # Restauration dans le même dictionnaire : les fonctions du préfixe y référencent leurs globales
+            namespace = self.namespace
+            checkpoint.state.restore(namespace)
+            self.checkpoints = [kept for kept in self.checkpoints if kept.statement_count <= start]
+        else:
+            namespace = {}
+            self.checkpoints = []
+        namespace["__builtins__"] = __builtins__
+
+        self.statements = statements
+        self.input_data = input_data
+        self.namespace = namespace
+        checkpointing = True
+        since_checkpoint = 0.0
+        last_cost = self.checkpoints[-1].state.cost if self.checkpoints else 0.0
+        checkpoint_bytes = self.checkpoint_bytes
+
+        sys.stdin = stdin
+        try:
+            with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
+                for position in range(start, len(module.body)):
+                    statement = module.body[position]
+                    tracer.last_statement = position == len(module.body) - 1
+                    tracer.statement_code = compile(
+                        ast.Module(body=[statement], type_ignores=[]), USER_FILENAME, "exec",
+                        flags=flags, dont_inherit=True
+                    )
+                    started = perf_counter()
+                    sys.settrace(tracer.trace_calls)
+                    try:
+                        exec(tracer.statement_code, namespace)
+                    finally:
+                        sys.settrace(None)
+                    duration = perf_counter() - started
+                    elapsed += duration
+                    since_checkpoint += duration
+                    tracer.first_statement = False
+
+                    checkpointing = checkpointing and not (
+                        has_external_effects(statement) or mutates_module(statement, namespace)
+                    )
+                    if not checkpointing or tracer.last_statement \
+                            or since_checkpoint < max(CHECKPOINT_MIN_INTERVAL, CHECKPOINT_COST_RATIO * last_cost):
+                        continue
+
+                    try:
+                        state = ProgramState(namespace)
+                    except Exception:
+                        checkpointing = False
+                        continue
+                    if checkpoint_bytes + state.size > self.max_checkpoint_bytes:
+                        checkpointing = False
+                        continue
+
+                    self.checkpoints.append(Checkpoint(
+                        position + 1, tracer.boundary, stdout_buffer.tell(), stdin.tell(), elapsed, state
+                    ))
+                    checkpoint_bytes += state.size
+                    last_cost = state.cost
+                    since_checkpoint = 0.0
+        finally:
+            sys.stdin = sys.__stdin__
+            self.steps = tracer.steps
+            self.index = tracer.index
+            self.output = stdout_buffer.getvalue()
+
+        return self.output, stderr_buffer.getvalue(), checkpoint.step_count if checkpoint else 0
+
+
 class PythonExecutor:
     """Exécuteur pour le code Python avec traçage."""
 
-    def __init__(self):
+    def __init__(self, max_replay_sessions: int = 64, max_trace_indexes: int = 256,
+                 max_trace_index_bytes: int = 128 * 1024 * 1024, max_incremental_sessions: int = 64,
+                 max_incremental_bytes: int = 256 * 1024 * 1024):
         self.tracer = PythonTracer()
+        self.max_replay_sessions = max_replay_sessions
+        self.replay_sessions: "OrderedDict[str, ReplaySession]" = OrderedDict()
+        self.max_trace_indexes = max_trace_indexes
+        self.trace_indexes: "OrderedDict[str, TraceIndex]" = OrderedDict()
+        self.max_trace_index_bytes = max_trace_index_bytes
+        self.max_incremental_sessions = max_incremental_sessions
+        self.max_incremental_bytes = max_incremental_bytes
+        self.incremental_sessions: "OrderedDict[str, IncrementalSession]" = OrderedDict()
+
+    @staticmethod
+    def _remember(store: OrderedDict, key: str, value: Any, max_size: int):
+        """Ajoute une entrée à un cache LRU borné."""
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_size:
+            store.popitem(last=False)
 
-    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+    def _remember_index(self, trace_id: str, index: TraceIndex) -> bool:
+        """
+        Conserve l'index d'une trace, dans la limite du nombre d'index et de
+        leur mémoire estimée totale. Retourne False si l'index est trop gros
+        pour être conservé.
+        """
+        if index.size > self.max_trace_index_bytes:
+            return False
+        self._remember(self.trace_indexes, trace_id, index, self.max_trace_indexes)
+        total = sum(kept.size for kept in self.trace_indexes.values())
+        while total > self.max_trace_index_bytes:
+            _, evicted = self.trace_indexes.popitem(last=False)
+            total -= evicted.size
+        return True
+
+    def _remember_session(self, session_id: str, session: "IncrementalSession"):
+        """
+        Conserve une session d'édition, dans la limite du nombre de sessions et
+        de leur mémoire estimée totale. Une session trop grosse est oubliée.
+        """
+        if session.size > self.max_incremental_bytes:
+            self.incremental_sessions.pop(session_id, None)
+            return
+        self._remember(self.incremental_sessions, session_id, session, self.max_incremental_sessions)
+        total = sum(kept.size for kept in self.incremental_sessions.values())
+        while total > self.max_incremental_bytes:
+            _, evicted = self.incremental_sessions.popitem(last=False)
+            total -= evicted.size
+
+    async def execute_with_trace(self, code: str, input_data: Optional[str] = None, timeout: int = 30,
+                                 trace_mode: str = "full", memory_interval: Optional[int] = None,
+                                 tracer_backend: str = "settrace", session_id: Optional[str] = None) -> ExecutionResult:
         """Exécute le code Python avec traçage complet."""
+        if trace_mode == "replay":
+            return await self.execute_with_replay(code, input_data, timeout)
+        if trace_mode == "profile":
+            return await self.execute_with_profile(code, input_data, timeout)
+        if session_id and tracer_backend == "settrace" and not memory_interval:
+            return await self.execute_incremental(code, session_id, input_data, timeout)
+
         result = ExecutionResult()
         start_time = time.time()
+        started_tracemalloc = False
 
         try:
             # Préparer l'environnement d'exécution
@@ -120,7 +1154,18 @@ class PythonExecutor:
             stderr_buffer = io.StringIO()
 
             # Réinitialiser le traceur
-            self.tracer = PythonTracer()
+            if tracer_backend == "ast":
+                self.tracer = AstTracer(memory_interval=memory_interval)
+                compiled = self.tracer.instrument(code)
+            else:
+                self.tracer = PythonTracer(memory_interval=memory_interval)
+                # Compilé avant tracemalloc : le code n'est pas une allocation du programme
+                compiled = compile(code, USER_FILENAME, "exec")
+
+            # Activer le suivi des allocations si la mesure mémoire est demandée
+            if memory_interval and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
 
             # Si des données d'entrée sont fournies, préparer sys.stdin
             if input_data:
@@ -128,16 +1173,22 @@ class PythonExecutor:
 
             # Rediriger stdout et stderr
             with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
-                # Activer le traçage
-                sys.settrace(self.tracer.trace_calls)
+                # Activer le traçage (le backend AST n'utilise pas sys.settrace)
+                exec_globals = {"__builtins__": __builtins__}
+                if tracer_backend == "ast":
+                    exec_globals.update(self.tracer.hooks())
+                else:
+                    sys.settrace(self.tracer.trace_calls)
 
                 # Exécuter le code
-                exec_globals = {"__builtins__": __builtins__}
-                exec(code, exec_globals)
+                exec(compiled, exec_globals)
 
                 # Désactiver le traçage
                 sys.settrace(None)
 
+            if memory_interval:
+                result.memory = self.tracer.memory_report()
+
             # Capturer la sortie
             output = stdout_buffer.getvalue()
             error_output = stderr_buffer.getvalue()
@@ -151,6 +1202,11 @@ class PythonExecutor:
             # Récupérer les étapes de traçage
             result.steps = self.tracer.steps
 
+            # Conserver l'index pour les requêtes sur la trace
+            trace_id = uuid.uuid4().hex
+            if self._remember_index(trace_id, self.tracer.index):
+                result.trace_id = trace_id
+
         except Exception as e:
             result.error = str(e)
             result.status = "error"
@@ -168,6 +1224,8 @@ class PythonExecutor:
         finally:
             # Nettoyer
             sys.settrace(None)
+            if started_tracemalloc:
+                tracemalloc.stop()
             if hasattr(sys.stdin, 'close'):
                 sys.stdin.close()
             sys.stdin = sys.__stdin__
@@ -176,6 +1234,130 @@ class PythonExecutor:
 
         return result
 
+    async def execute_incremental(self, code: str, session_id: str, input_data: Optional[str] = None,
+                                  timeout: int = 30) -> ExecutionResult:
+        """
+        Exécute le code d'une session d'édition avec traçage complet, en
+        reprenant au dernier point de contrôle commun avec l'exécution
+        précédente de la session (voir `IncrementalSession`).
+        """
+        result = ExecutionResult()
+        start_time = time.time()
+
+        session = self.incremental_sessions.get(session_id)
+        if session is None:
+            session = IncrementalSession()
+
+        try:
+            output, error_output, resumed_steps = session.run(code, input_data)
+
+            if output:
+                result.output = output.strip().split('\n')
+            if error_output:
+                result.error = error_output
+                result.status = "error"
+
+            result.steps = session.steps
+            result.resumed_steps = resumed_steps
+
+            trace_id = uuid.uuid4().hex
+            if self._remember_index(trace_id, session.index):
+                result.trace_id = trace_id
+
+        except Exception as e:
+            result.error = str(e)
+            result.status = "error"
+            result.steps = [ExecutionStep(line=1, step=0, stack=[], output=[], error=str(e))]
+
+        finally:
+            self._remember_session(session_id, session)
+            result.execution_time = time.time() - start_time
+
+        return result
+
+    async def execute_with_replay(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+        """
+        Exécute le code en mode enregistrement : seules les entrées non
+        déterministes et la ligne de chaque étape sont conservées. Les étapes
+        complètes sont obtenues ensuite avec `materialize_steps`.
+        """
+        result = ExecutionResult()
+        start_time = time.time()
+
+        log = NondeterminismLog(input_data)
+        tracer = RecordingTracer()
+
+        try:
+            output, error_output = run_traced(code, tracer, input_data, log)
+
+            if output:
+                result.output = output.strip().split('\n')
+            if error_output:
+                result.error = error_output
+                result.status = "error"
+
+        except Exception as e:
+            result.error = str(e)
+            result.status = "error"
+
+        finally:
+            result.execution_time = time.time() - start_time
+
+        session = ReplaySession(code, log, tracer)
+        trace_id = uuid.uuid4().hex
+        self._remember(self.replay_sessions, trace_id, session, self.max_replay_sessions)
+        self._remember_index(trace_id, tracer.index)
+
+        result.trace_id = trace_id
+        result.step_lines = session.lines.tolist()
+        result.steps = tracer.steps
+        if not result.steps and result.error:
+            result.steps = [ExecutionStep(line=1, step=0, stack=[], output=[], error=result.error)]
+
+        return result
+
+    async def execute_with_profile(self, code: str, input_data: Optional[str] = None, timeout: int = 30) -> ExecutionResult:
+        """Exécute le code en mode profilage : profil par ligne, sans étapes."""
+        result = ExecutionResult()
+        start_time = time.time()
+        tracer = ProfilingTracer()
+
+        try:
+            output, error_output = run_traced(code, tracer, input_data)
+
+            if output:
+                result.output = output.strip().split('\n')
+            if error_output:
+                result.error = error_output
+                result.status = "error"
+
+        except Exception as e:
+            result.error = str(e)
+            result.status = "error"
+            result.steps = [ExecutionStep(line=1, step=0, stack=[], output=[], error=str(e))]
+
+        finally:
+            result.execution_time = time.time() - start_time
+
+        result.profile = tracer.get_profile()
+        return result
+
+    async def materialize_steps(self, trace_id: str, start: int, count: int = 1) -> List[ExecutionStep]:
+        """Matérialise des étapes d'une trace enregistrée en mode replay."""
+        session = self.replay_sessions.get(trace_id)
+        if session is None:
+            raise KeyError(trace_id)
+        self.replay_sessions.move_to_end(trace_id)
+        return session.materialize(start, count)
+
+    def get_trace_index(self, trace_id: str) -> TraceIndex:
+        """Retourne l'index d'une trace récente."""
+        index = self.trace_indexes.get(trace_id)
+        if index is None:
+            raise KeyError(trace_id)
+        self.trace_indexes.move_to_end(trace_id)
+        return index
+
     async def validate_syntax(self, code: str) -> ValidationResult:
         """Valide la syntaxe du code Python."""
         result = ValidationResult(is_valid=True)
@@ -0,0 +1,158 @@
+"""
+Réponses JSON avec ETag et compression négociée (gzip, brotli si disponible).
+
+Les contenus statiques sont sérialisés et compressés une seule fois au
+démarrage ; les contenus dynamiques volumineux sont compressés hors de la
+boucle d'événements. Les réponses qui ne peuvent pas se répéter (résultat
+d'une exécution) n'ont pas d'ETag.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip reste disponible
+    brotli = None
+
+# En dessous de cette taille, la compression ne vaut pas son coût
+MIN_COMPRESS_SIZE = 1024
+
+# Au-delà de cette taille, la compression est faite dans un thread
+OFFLOAD_COMPRESS_SIZE = 64 * 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_BROTLI_QUALITY = 11
+
+
+def compute_etag(body: bytes) -> str:
+    """ETag faible du corps non compressé (identique quel que soit l'encodage)."""
+    return f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _quality(params: str) -> float:
+    """Valeur q des paramètres d'un encodage ; 1 si absente ou invalide."""
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                return 1.0
+            return quality if 0.0 <= quality <= 1.0 else 1.0
+    return 1.0
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Encodages pris en charge, par ordre de préférence à qualité égale."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choisit l'encodage de la réponse d'après l'en-tête Accept-Encoding :
+    celui de plus haute qualité, brotli avant gzip à qualité égale.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if coding:
+            qualities[coding] = _quality(params)
+
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """Compresse un corps avec l'encodage donné."""
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if static else GZIP_LEVEL)
+
+
+def serialize(content: Any) -> bytes:
+    """Sérialise un contenu en JSON compact."""
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Vrai si le client possède déjà la représentation identifiée par `etag`."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # La comparaison faible ignore le préfixe W/
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or etag in candidates or bare in candidates
+
+
+def _build_response(request: Request, body: bytes, etag: Optional[str], encodings: Dict[str, bytes],
+                    cache_control: str) -> Response:
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": cache_control}
+
+    if etag is not None:
+        headers["ETag"] = etag
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding in encodings:
+        headers["Content-Encoding"] = encoding
+        body = encodings[encoding]
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class PrecompressedPayload:
+    """Réponse JSON statique, sérialisée et compressée une fois pour toutes."""
+
+    def __init__(self, content: Any, cache_control: str = "public, max-age=3600"):
+        self.body = serialize(content)
+        self.etag = compute_etag(self.body)
+        self.cache_control = cache_control
+        self.encodings: Dict[str, bytes] = {}
+        # Compression faite une seule fois : gardée dès qu'elle réduit la taille
+        for encoding in available_encodings():
+            compressed = compress(self.body, encoding, static=True)
+            if len(compressed) < len(self.body):
+                self.encodings[encoding] = compressed
+
+    def response(self, request: Request) -> Response:
+        """Retourne la représentation adaptée à la requête (ou un 304)."""
+        return _build_response(request, self.body, self.etag, self.encodings, self.cache_control)
+
+
+async def json_response(request: Request, body: bytes, cache_control: str = "no-cache",
+                        conditional: bool = True) -> Response:
+    """
+    Réponse JSON dynamique avec compression négociée, et ETag si `conditional`.
+    Les gros corps sont compressés dans un thread pour ne pas bloquer la
+    boucle d'événements.
+    """
+    etag = compute_etag(body) if conditional else None
+    encodings: Dict[str, bytes] = {}
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= MIN_COMPRESS_SIZE and not (etag and not_modified(request, etag)):
+        if len(body) >= OFFLOAD_COMPRESS_SIZE:
+            loop = asyncio.get_running_loop()
+            encodings[encoding] = await loop.run_in_executor(None, compress, body, encoding)
+        else:
+            encodings[encoding] = compress(body, encoding)
+
+    return _build_response(request, body, etag, encodings, cache_control)
@@ -0,0 +1,167 @@
+"""
+Exécution asynchrone des requêtes via Celery.
+
+L'API soumet un job et rend immédiatement son identifiant ; l'exécution
+est faite par des workers Celery, éventuellement sur d'autres machines.
+
+Chaque langage a sa propre file (`execute.python`, `execute.c`, ...).
+Un worker annonce les langages qu'il sait exécuter avec la variable
+d'environnement `WORKER_LANGUAGES` et ne consomme que les files
+correspondantes :
+
+    WORKER_LANGUAGES=python,c celery -A app.jobs worker
+
+Les index de trace et les sessions de replay restent dans le worker : les
+résultats des jobs n'ont donc pas de `trace_id`, et le mode replay est
+refusé à la soumission.
+
+Le `timeout` de la requête est appliqué au worker : au-delà, la tâche
+reçoit `SoftTimeLimitExceeded`, puis le processus est tué après
+JOB_TIME_LIMIT_GRACE secondes si le code utilisateur l'a intercepté. Dans
+les deux cas le job est en échec.
+
+Pour les tests, `CELERY_TASK_ALWAYS_EAGER=1` exécute les jobs localement
+sans broker.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from celery import Celery, uuid
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+from celery.result import AsyncResult
+from celery.signals import celeryd_after_setup
+
+from .models import ExecutionRequest, JobState, JobStatusResponse, LanguageType
+
+QUEUE_PREFIX = "execute."
+
+# État enregistré à la soumission : Celery rapporte PENDING pour un identifiant
+# inconnu, ce qui ne permet pas de distinguer un job en file d'un job inexistant
+SUBMITTED = "SUBMITTED"
+
+# Délai accordé après la limite douce avant de tuer le processus du worker (secondes)
+JOB_TIME_LIMIT_GRACE = 5
+
+TIMEOUT_MESSAGE = "Temps d'exécution dépassé"
+
+_always_eager = os.getenv("CELERY_TASK_ALWAYS_EAGER", "").lower() in ("1", "true", "yes")
+
+celery_app = Celery(
+    "python_geeks",
+    broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+    backend=os.getenv(
+        "CELERY_RESULT_BACKEND",
+        "cache+memory://" if _always_eager else "redis://localhost:6379/1"
+    ),
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_expires=int(os.getenv("JOB_RESULT_TTL", "3600")),
+    task_always_eager=_always_eager,
+    task_store_eager_result=True,
+)
+
+# Correspondance entre les états Celery et les états exposés par l'API
+_STATE_MAP = {
+    SUBMITTED: JobState.QUEUED,
+    "RECEIVED": JobState.QUEUED,
+    "RETRY": JobState.QUEUED,
+    "STARTED": JobState.RUNNING,
+    "SUCCESS": JobState.COMPLETED,
+    "FAILURE": JobState.FAILED,
+    "REVOKED": JobState.FAILED,
+}
+
+
+def queue_for_language(language: str) -> str:
+    """Nom de la file Celery réservée à un langage."""
+    return f"{QUEUE_PREFIX}{language}"
+
+
+@celeryd_after_setup.connect
+def _select_language_queues(sender, instance, **kwargs):
+    """Abonne le worker aux files des langages qu'il annonce."""
+    languages = os.getenv("WORKER_LANGUAGES")
+    if not languages:
+        languages = ",".join(language.value for language in LanguageType)
+
+    queues = instance.app.amqp.queues
+    for language in languages.split(","):
+        language = language.strip()
+        if language:
+            queues.select_add(queue_for_language(language))
+
+    # La file par défaut n'est jamais utilisée pour les exécutions
+    if instance.app.conf.task_default_queue in queues.consume_from:
+        queues.deselect(instance.app.conf.task_default_queue)
+
+
+@celery_app.task(name="python_geeks.execute")
+def execute_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Tâche Celery : exécute une requête et retourne la réponse sérialisée."""
+    from .execution import run_execution
+
+    request = ExecutionRequest(**payload)
+    started = time.monotonic()
+    try:
+        response = asyncio.run(run_execution(request))
+    except SoftTimeLimitExceeded:
+        raise TimeoutError(_timeout_message(request.timeout))
+    # L'exception levée dans le code utilisateur a pu être capturée par l'exécuteur
+    if time.monotonic() - started >= request.timeout:
+        raise TimeoutError(_timeout_message(request.timeout))
+    # L'index de la trace reste dans ce worker, inaccessible depuis l'API
+    response.trace_id = None
+    return response.model_dump(mode="json")
+
+
+def _timeout_message(timeout: int) -> str:
+    return f"{TIMEOUT_MESSAGE} ({timeout} s)"
+
+
+def submit_job(request: ExecutionRequest) -> str:
+    """Soumet une requête d'exécution et retourne l'identifiant du job."""
+    # Enregistré avant l'envoi : le worker peut terminer avant le retour de apply_async
+    job_id = uuid()
+    celery_app.backend.store_result(job_id, None, SUBMITTED)
+    execute_job.apply_async(
+        args=[request.model_dump(mode="json")],
+        queue=queue_for_language(request.language.value),
+        task_id=job_id,
+        soft_time_limit=request.timeout,
+        time_limit=request.timeout + JOB_TIME_LIMIT_GRACE,
+    )
+    return job_id
+
+
+def get_job_status(job_id: str) -> JobStatusResponse:
+    """
+    Retourne l'état courant d'un job et son résultat s'il est terminé.
+    Lève KeyError si le job n'a jamais été soumis ou si son résultat a expiré.
+    """
+    async_result = AsyncResult(job_id, app=celery_app)
+    if async_result.state == "PENDING":
+        raise KeyError(job_id)
+    state = _STATE_MAP.get(async_result.state, JobState.QUEUED)
+
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    if state == JobState.COMPLETED:
+        result = async_result.result
+    elif state == JobState.FAILED:
+        if isinstance(async_result.result, TimeLimitExceeded):
+            # Processus tué à la limite dure : le code a ignoré la limite douce
+            error = TIMEOUT_MESSAGE
+        else:
+            error = str(async_result.result)
+
+    return JobStatusResponse(job_id=job_id, status=state, result=result, error=error)
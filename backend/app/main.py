@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -6,11 +6,19 @@ from typing import Dict, List, Any, Optional
 import asyncio
 import json
 import logging
+import secrets
 from datetime import datetime
 
-from .executors import PythonExecutor, JavaScriptExecutor, CExecutor
-from .models import ExecutionRequest, ExecutionResponse, ExecutionStep
-from .visualizer import CodeVisualizer
+from .broadcast import BroadcastManager, CLOSED, DROPPED
+from .execution import executors, run_execution
+from .http_cache import PrecompressedPayload, json_response
+from .jobs import get_job_status, submit_job
+from .models import (
+    ExecutionRequest, ExecutionResponse, ExecutionStep,
+    JobState, JobStatusResponse, JobSubmission, TraceMode, TraceStepsResponse,
+    LineHitsResponse, VariableHistoryResponse, CallsResponse,
+    BroadcastCreated, BroadcastPosition,
+)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -34,14 +42,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialisation des exécuteurs
-executors = {
-    "python": PythonExecutor(),
-    "javascript": JavaScriptExecutor(),
-    "c": CExecutor(),
-}
+# Intervalle de scrutation des jobs pour les abonnés WebSocket (secondes)
+JOB_POLL_INTERVAL = 0.5
 
-visualizer = CodeVisualizer()
+# Durée maximale d'un abonnement WebSocket à un job (secondes)
+JOB_SUBSCRIPTION_TIMEOUT = 600
+
+broadcasts = BroadcastManager()
 
 @app.get("/")
 async def root():
@@ -63,7 +70,7 @@ async def health_check():
     }
 
 @app.post("/api/execute", response_model=ExecutionResponse)
-async def execute_code(request: ExecutionRequest):
+async def execute_code(request: ExecutionRequest, http_request: Request):
     """
     Exécute le code fourni et retourne les étapes d'exécution pour la visualisation.
     """
@@ -77,44 +84,283 @@ async def execute_code(request: ExecutionRequest):
                 detail=f"Langage non supporté: {request.language}"
             )
 
-        # Obtention de l'exécuteur approprié
-        executor = executors[request.language]
+        response = await run_execution(request)
 
-        # Exécution du code avec traçage
-        execution_result = await executor.execute_with_trace(
-            code=request.code,
-            input_data=request.input_data,
-            timeout=request.timeout
+        logger.info(f"Exécution terminée avec {response.total_steps} étapes")
+        if response.memory:
+            logger.info(
+                f"Mémoire utilisateur: pic {response.memory.peak_bytes} octets, "
+                f"final {response.memory.final_bytes} octets"
+            )
+        # Chaque exécution produit une réponse nouvelle (trace_id) : pas de requête conditionnelle
+        return await json_response(http_request, response.model_dump_json().encode("utf-8"), conditional=False)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'exécution: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'exécution: {str(e)}"
         )
 
-        # Génération de la visualisation
-        visualization_data = await visualizer.generate_visualization(
-            execution_result, request.language
+@app.get("/api/traces/{trace_id}/steps", response_model=TraceStepsResponse)
+async def get_trace_steps(
+    trace_id: str,
+    start: int = Query(0, ge=0),
+    count: int = Query(1, ge=1, le=100)
+):
+    """
+    Matérialise des étapes d'une trace Python exécutée en mode replay.
+    """
+    executor = executors["python"]
+
+    try:
+        steps = await executor.materialize_steps(trace_id, start, count)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Trace inconnue ou expirée: {trace_id}"
         )
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return TraceStepsResponse(
+        trace_id=trace_id,
+        start=start,
+        total_steps=executor.replay_sessions[trace_id].total_steps,
+        steps=steps
+    )
+
+def _get_trace_index(trace_id: str):
+    """Retourne l'index d'une trace Python ou lève une erreur 404."""
+    try:
+        return executors["python"].get_trace_index(trace_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Trace inconnue ou expirée: {trace_id}"
+        )
+
+@app.get("/api/traces/{trace_id}/lines/{line}", response_model=LineHitsResponse)
+async def get_line_hits(
+    trace_id: str,
+    line: int,
+    after: int = Query(-1, ge=-1),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Retourne les étapes passant par une ligne, à partir de l'étape `after` exclue.
+    """
+    index = _get_trace_index(trace_id)
+    steps, total_hits = index.steps_at_line(line, after, limit)
+    return LineHitsResponse(trace_id=trace_id, line=line, total_hits=total_hits, steps=steps)
+
+@app.get("/api/traces/{trace_id}/variables")
+async def get_trace_variables(trace_id: str):
+    """
+    Retourne les noms des variables observées dans une trace.
+    """
+    index = _get_trace_index(trace_id)
+    return {"trace_id": trace_id, "variables": index.variable_names()}
+
+@app.get("/api/traces/{trace_id}/variables/{name}", response_model=VariableHistoryResponse)
+async def get_variable_history(
+    trace_id: str,
+    name: str,
+    after: int = Query(-1, ge=-1),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Retourne les étapes où une variable change de valeur, avec la nouvelle valeur.
+    """
+    index = _get_trace_index(trace_id)
+    return VariableHistoryResponse(
+        trace_id=trace_id,
+        name=name,
+        changes=index.variable_changes(name, after, limit)
+    )
+
+@app.get("/api/traces/{trace_id}/calls", response_model=CallsResponse)
+async def get_trace_calls(
+    trace_id: str,
+    function: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Retourne les paires appel/retour de fonctions d'une trace.
+    """
+    index = _get_trace_index(trace_id)
+    return CallsResponse(trace_id=trace_id, calls=index.call_records(function, limit))
 
-        # Construction de la réponse
-        response = ExecutionResponse(
-            steps=execution_result.steps,
-            current_step=0,
-            total_steps=len(execution_result.steps),
-            language=request.language,
-            code=request.code,
-            status=execution_result.status,
-            final_output=execution_result.output,
-            execution_time=execution_result.execution_time,
-            visualization=visualization_data
+@app.post("/api/jobs", response_model=JobSubmission, status_code=202)
+async def create_job(request: ExecutionRequest):
+    """
+    Soumet une exécution asynchrone et retourne immédiatement l'identifiant du job.
+    """
+    if request.language not in executors:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Langage non supporté: {request.language}"
         )
 
-        logger.info(f"Exécution terminée avec {len(execution_result.steps)} étapes")
-        return response
+    # La session de replay resterait dans le worker : ses étapes seraient introuvables ici
+    if request.trace_mode == TraceMode.REPLAY:
+        raise HTTPException(
+            status_code=400,
+            detail="Le mode replay n'est pas disponible pour les jobs"
+        )
 
+    try:
+        # L'envoi au broker est bloquant : on le fait hors de la boucle d'événements
+        loop = asyncio.get_running_loop()
+        job_id = await loop.run_in_executor(None, submit_job, request)
     except Exception as e:
-        logger.error(f"Erreur lors de l'exécution: {str(e)}")
+        logger.error(f"Erreur lors de la soumission du job: {str(e)}")
         raise HTTPException(
-            status_code=500,
-            detail=f"Erreur lors de l'exécution: {str(e)}"
+            status_code=503,
+            detail=f"File d'exécution indisponible: {str(e)}"
         )
 
+    logger.info(f"Job {job_id} soumis pour le langage: {request.language}")
+    return JobSubmission(job_id=job_id)
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str, http_request: Request):
+    """
+    Retourne l'état d'un job et son résultat lorsqu'il est terminé.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        status = await loop.run_in_executor(None, get_job_status, job_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job inconnu ou expiré: {job_id}"
+        )
+    return await json_response(http_request, status.model_dump_json().encode("utf-8"))
+
+@app.websocket("/api/jobs/{job_id}/ws")
+async def job_updates(websocket: WebSocket, job_id: str):
+    """
+    Pousse les changements d'état d'un job jusqu'à sa fin, puis ferme la connexion.
+    L'abonnement est fermé (code 4408) après JOB_SUBSCRIPTION_TIMEOUT secondes.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        status = await loop.run_in_executor(None, get_job_status, job_id)
+    except KeyError:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+
+    async def watch():
+        # Les abonnés n'envoient rien : la réception sert à détecter la déconnexion
+        while True:
+            await websocket.receive_text()
+
+    watcher = asyncio.create_task(watch())
+    deadline = loop.time() + JOB_SUBSCRIPTION_TIMEOUT
+    last_state = None
+
+    try:
+        while True:
+            if status.status != last_state:
+                await websocket.send_text(status.model_dump_json())
+                last_state = status.status
+            if status.status in (JobState.COMPLETED, JobState.FAILED):
+                await websocket.close()
+                return
+            if loop.time() >= deadline:
+                await websocket.close(code=4408)
+                return
+
+            await asyncio.wait({watcher}, timeout=JOB_POLL_INTERVAL)
+            if watcher.done():
+                logger.info(f"Abonné du job {job_id} déconnecté")
+                return
+            status = await loop.run_in_executor(None, get_job_status, job_id)
+    except KeyError:
+        # Résultat expiré pendant l'abonnement
+        await websocket.close(code=4404)
+    except (WebSocketDisconnect, RuntimeError):
+        logger.info(f"Abonné du job {job_id} déconnecté")
+    finally:
+        watcher.cancel()
+
+@app.post("/api/broadcasts", response_model=BroadcastCreated, status_code=201)
+async def create_broadcast(request: ExecutionRequest):
+    """
+    Crée une diffusion : le code est exécuté une seule fois et ses étapes sont
+    publiées à tous les spectateurs connectés.
+    """
+    if request.language not in executors:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Langage non supporté: {request.language}"
+        )
+
+    session = broadcasts.create(request)
+    session.task = asyncio.create_task(broadcasts.run(session))
+
+    logger.info(f"Diffusion {session.broadcast_id} créée pour le langage: {request.language}")
+    return BroadcastCreated(broadcast_id=session.broadcast_id, token=session.token)
+
+@app.post("/api/broadcasts/{broadcast_id}/position")
+async def set_broadcast_position(broadcast_id: str, position: BroadcastPosition):
+    """
+    Déplace la position de l'enseignant ; elle est synchronisée chez tous les spectateurs.
+    """
+    try:
+        session = broadcasts.get(broadcast_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Diffusion inconnue ou expirée: {broadcast_id}"
+        )
+
+    if not secrets.compare_digest(position.token, session.token):
+        raise HTTPException(status_code=403, detail="Jeton de diffusion invalide")
+
+    session.seek(position.step)
+    return {"broadcast_id": broadcast_id, "step": position.step, "viewers": len(session.subscribers)}
+
+@app.websocket("/api/broadcasts/{broadcast_id}/ws")
+async def broadcast_updates(websocket: WebSocket, broadcast_id: str):
+    """
+    Abonne un spectateur : instantané (trames déjà produites et position), puis flux en direct.
+    """
+    try:
+        session = broadcasts.get(broadcast_id)
+    except KeyError:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    queue = session.subscribe()
+
+    async def forward():
+        while True:
+            message = await queue.get()
+            if message is CLOSED:
+                await websocket.close()
+                return
+            if message is DROPPED:
+                # 1013 : réessayer plus tard (le spectateur peut se réabonner)
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+
+    sender = asyncio.create_task(forward())
+    try:
+        # Les spectateurs n'envoient rien : la réception sert à détecter la déconnexion
+        while not sender.done():
+            await websocket.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        sender.cancel()
+        session.unsubscribe(queue)
+
 @app.post("/api/validate")
 async def validate_code(request: ExecutionRequest):
     """
@@ -143,16 +389,12 @@ async def validate_code(request: ExecutionRequest):
             detail=f"Erreur lors de la validation: {str(e)}"
         )
 
-@app.get("/api/examples/{language}")
-async def get_examples(language: str):
-    """
-    Récupère des exemples de code pour un langage donné.
-    """
-    examples_map = {
-        "python": [
-            {
-                "title": "Factorielle récursive",
-                "code": """def factorial(n):
+# Contenus statiques : sérialisés et compressés une seule fois au démarrage
+EXAMPLES = {
+    "python": [
+        {
+            "title": "Factorielle récursive",
+            "code": """def factorial(n):
     if n <= 1:
         return 1
     else:
@@ -160,11 +402,11 @@ async def get_examples(language: str):
 
 result = factorial(5)
 print(f"5! = {result}")""",
-                "description": "Calcul de la factorielle en utilisant la récursion"
-            },
-            {
-                "title": "Tri à bulles",
-                "code": """def bubble_sort(arr):
+            "description": "Calcul de la factorielle en utilisant la récursion"
+        },
+        {
+            "title": "Tri à bulles",
+            "code": """def bubble_sort(arr):
     n = len(arr)
     for i in range(n):
         for j in range(0, n - i - 1):
@@ -175,13 +417,13 @@ print(f"5! = {result}")""",
 numbers = [64, 34, 25, 12, 22, 11, 90]
 sorted_numbers = bubble_sort(numbers.copy())
 print(f"Tableau trié: {sorted_numbers}")""",
-                "description": "Algorithme de tri à bulles"
-            }
-        ],
-        "javascript": [
-            {
-                "title": "Fibonacci récursif",
-                "code": """function fibonacci(n) {
+            "description": "Algorithme de tri à bulles"
+        }
+    ],
+    "javascript": [
+        {
+            "title": "Fibonacci récursif",
+            "code": """function fibonacci(n) {
     if (n <= 1) {
         return n;
     }
@@ -190,58 +432,72 @@ print(f"Tableau trié: {sorted_numbers}")""",
 
 let result = fibonacci(7);
 console.log(`Fibonacci(7) = ${result}`);""",
-                "description": "Calcul de Fibonacci en récursif"
-            }
-        ],
-        "c": [
-            {
-                "title": "Hello World",
-                "code": """#include <stdio.h>
+            "description": "Calcul de Fibonacci en récursif"
+        }
+    ],
+    "c": [
+        {
+            "title": "Hello World",
+            "code": """#include <stdio.h>
 
 int main() {
     printf("Hello, World!\\n");
     return 0;
 }""",
-                "description": "Programme Hello World en C"
-            }
-        ]
-    }
+            "description": "Programme Hello World en C"
+        }
+    ]
+}
+
+LANGUAGES = {
+    "languages": [
+        {
+            "id": "python",
+            "name": "Python",
+            "version": "3.11",
+            "description": "Langage de programmation polyvalent"
+        },
+        {
+            "id": "javascript",
+            "name": "JavaScript",
+            "version": "ES2023",
+            "description": "Langage de programmation pour le web"
+        },
+        {
+            "id": "c",
+            "name": "C",
+            "version": "C11",
+            "description": "Langage de programmation système"
+        }
+    ]
+}
+
+EXAMPLES_PAYLOADS = {
+    language: PrecompressedPayload({"examples": examples})
+    for language, examples in EXAMPLES.items()
+}
+
+LANGUAGES_PAYLOAD = PrecompressedPayload(LANGUAGES)
 
-    if language not in examples_map:
+@app.get("/api/examples/{language}")
+async def get_examples(language: str, http_request: Request):
+    """
+    Récupère des exemples de code pour un langage donné.
+    """
+    if language not in EXAMPLES_PAYLOADS:
         raise HTTPException(
             status_code=404,
             detail=f"Aucun exemple disponible pour: {language}"
         )
 
-    return {"examples": examples_map[language]}
+    return EXAMPLES_PAYLOADS[language].response(http_request)
 
 @app.get("/api/languages")
-async def get_supported_languages():
+async def get_supported_languages(http_request: Request):
     """
     Retourne la liste des langages supportés.
     """
-    return {
-        "languages": [
-            {
-                "id": "python",
-                "name": "Python",
-                "version": "3.11",
-                "description": "Langage de programmation polyvalent"
-            },
-            {
-                "id": "javascript",
-                "name": "JavaScript",
-                "version": "ES2023",
-                "description": "Langage de programmation pour le web"
-            },
-            {
-                "id": "c",
-                "name": "C",
-                "version": "C11",
-                "description": "Langage de programmation système"
-            }
-        ]
-    }
+    return LANGUAGES_PAYLOAD.response(http_request)
 
 if __name__ == "__main__":
     import uvicorn
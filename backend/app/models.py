@@ -12,6 +12,15 @@ class ExecutionStatus(str, Enum):
     COMPLETED = "completed"
     ERROR = "error"
 
+class TraceMode(str, Enum):
+    FULL = "full"
+    REPLAY = "replay"
+    PROFILE = "profile"
+
+class TracerBackend(str, Enum):
+    SETTRACE = "settrace"
+    AST = "ast"
+
 class Variable(BaseModel):
     name: str
     value: Any
@@ -24,6 +33,21 @@ class StackFrame(BaseModel):
     locals: List[Variable] = []
     globals: List[Variable] = []
 
+class StepMemory(BaseModel):
+    allocated_bytes: int
+    peak_bytes: int
+
+class AllocationSite(BaseModel):
+    line: int
+    size_bytes: int
+    count: int
+
+class MemoryReport(BaseModel):
+    final_bytes: int
+    peak_bytes: int
+    samples: int
+    top_allocations: List[AllocationSite] = []
+
 class ExecutionStep(BaseModel):
     line: int
     step: int
@@ -31,12 +55,60 @@ class ExecutionStep(BaseModel):
     heap: Dict[str, Any] = {}
     output: List[str] = []
     error: Optional[str] = None
+    memory: Optional[StepMemory] = None
+
+class LineProfile(BaseModel):
+    line: int
+    hits: int
+    total_time: Optional[float] = None
+    self_time: Optional[float] = None
+
+class FunctionProfile(BaseModel):
+    function_name: str
+    calls: int
+    total_time: Optional[float] = None
+    self_time: Optional[float] = None
+
+class CallEdge(BaseModel):
+    caller: str
+    callee: str
+    calls: int
+
+class ProfileData(BaseModel):
+    lines: List[LineProfile] = []
+    functions: List[FunctionProfile] = []
+    call_edges: List[CallEdge] = []
+    total_time: float = 0.0
 
 class ExecutionRequest(BaseModel):
     code: str = Field(..., description="Code à exécuter")
     language: LanguageType = Field(..., description="Langage de programmation")
     input_data: Optional[str] = Field(None, description="Données d'entrée pour le programme")
     timeout: int = Field(30, description="Timeout en secondes", ge=1, le=60)
+    trace_mode: TraceMode = Field(
+        TraceMode.FULL,
+        description="Mode de traçage : 'full' (instantané à chaque étape), 'replay' "
+                    "(étapes matérialisées à la demande, Python uniquement) ou 'profile' "
+                    "(profil par ligne, sans étapes)"
+    )
+    memory_interval: Optional[int] = Field(
+        None,
+        description="Mesure mémoire (tracemalloc) toutes les N étapes en mode 'full', "
+                    "Python uniquement ; désactivée si absent",
+        ge=1, le=1000
+    )
+    tracer_backend: TracerBackend = Field(
+        TracerBackend.SETTRACE,
+        description="Backend de traçage Python en mode 'full' : 'settrace' ou 'ast' "
+                    "(instrumentation du code, plus rapide)"
+    )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session d'édition : en mode 'full' (Python, backend 'settrace', sans "
+                    "mesure mémoire), l'exécution reprend au dernier point de contrôle commun "
+                    "avec l'exécution précédente de la session",
+        min_length=1, max_length=64
+    )
 
 class ExecutionResponse(BaseModel):
     steps: List[ExecutionStep]
@@ -48,6 +120,68 @@ class ExecutionResponse(BaseModel):
     final_output: List[str] = []
     execution_time: float
     visualization: Optional[Dict[str, Any]] = None
+    trace_id: Optional[str] = None
+    step_lines: Optional[List[int]] = None
+    profile: Optional[ProfileData] = None
+    memory: Optional[MemoryReport] = None
+    resumed_steps: Optional[int] = None
+
+class TraceStepsResponse(BaseModel):
+    trace_id: str
+    start: int
+    total_steps: int
+    steps: List[ExecutionStep]
+
+class VariableChange(BaseModel):
+    step: int
+    function_name: str
+    scope: str
+    value: Any
+
+class CallRecord(BaseModel):
+    function_name: str
+    call_step: int
+    return_step: Optional[int] = None
+    return_value: Any = None
+
+class LineHitsResponse(BaseModel):
+    trace_id: str
+    line: int
+    total_hits: int
+    steps: List[int]
+
+class VariableHistoryResponse(BaseModel):
+    trace_id: str
+    name: str
+    changes: List[VariableChange]
+
+class CallsResponse(BaseModel):
+    trace_id: str
+    calls: List[CallRecord]
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobSubmission(BaseModel):
+    job_id: str
+    status: JobState = JobState.QUEUED
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: JobState
+    result: Optional[ExecutionResponse] = None
+    error: Optional[str] = None
+
+class BroadcastCreated(BaseModel):
+    broadcast_id: str
+    token: str = Field(..., description="Jeton de l'enseignant, requis pour déplacer la position")
+
+class BroadcastPosition(BaseModel):
+    step: int = Field(..., ge=0)
+    token: str
 
 class ValidationError(BaseModel):
     line: int
@@ -0,0 +1,148 @@
+"""
+Index d'une trace d'exécution, construit pendant le traçage.
+
+Permet de répondre sans parcourir toutes les étapes aux questions du type
+« quelles étapes passent par la ligne 6 », « quand `arr` a-t-il changé »
+ou « quels appels de fonction ont eu lieu ».
+"""
+
+import sys
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import CallRecord, StackFrame, VariableChange
+
+# Les variables globales sont suivies sous ce nom de fonction
+GLOBAL_SCOPE = "<module>"
+
+_MISSING = object()
+
+# Mémoire estimée d'une entrée de l'index, hors valeur stockée (octets)
+ENTRY_BYTES = 80
+
+
+def value_size(value: Any) -> int:
+    """Mémoire estimée d'une valeur formatée : les chaînes ne sont pas tronquées."""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_size(key) + value_size(item) for key, item in value.items())
+    return sys.getsizeof(value)
+
+
+class TraceIndex:
+    """Index ligne → étapes, variable → points de changement, et paires appel/retour."""
+
+    def __init__(self):
+        self.line_steps: Dict[int, List[int]] = defaultdict(list)
+        self.change_steps: Dict[str, List[int]] = defaultdict(list)
+        self.changes: Dict[str, List[Tuple[int, str, str, Any]]] = defaultdict(list)
+        self.calls: List[Tuple[str, int, Optional[int], Any]] = []
+        self._open_calls: List[int] = []
+        self._last_values: Dict[Tuple[str, str, str], Any] = {}
+        # Mémoire estimée des entrées et des valeurs indexées (octets), pour
+        # borner la mémoire des index conservés
+        self.size = 0
+
+    def record_position(self, step: int, line: int, function_name: str,
+                        is_call: bool = False, is_return: bool = False, return_value: Any = None):
+        """Indexe la ligne d'une étape et les appels/retours de fonction."""
+        self.line_steps[line].append(step)
+        self.size += ENTRY_BYTES
+
+        if is_call:
+            self._open_calls.append(len(self.calls))
+            self.calls.append((function_name, step, None, None))
+        elif is_return and self._open_calls:
+            index = self._open_calls.pop()
+            name, call_step, _, _ = self.calls[index]
+            self.calls[index] = (name, call_step, step, return_value)
+            self.size += value_size(return_value)
+
+    def record_variables(self, step: int, frame: StackFrame):
+        """Indexe les variables dont la valeur a changé depuis la dernière étape."""
+        # Au niveau du module, une même valeur est indexée en portée locale et globale
+        counted = set()
+        for variable in frame.locals + frame.globals:
+            function_name = frame.function_name if variable.scope == "local" else GLOBAL_SCOPE
+            key = (function_name, variable.scope, variable.name)
+            if self._last_values.get(key, _MISSING) == variable.value:
+                continue
+            self._last_values[key] = variable.value
+            self.change_steps[variable.name].append(step)
+            self.changes[variable.name].append((step, function_name, variable.scope, variable.value))
+            self.size += ENTRY_BYTES
+            if id(variable.value) not in counted:
+                counted.add(id(variable.value))
+                self.size += value_size(variable.value)
+
+    def truncated(self, step: int) -> "TraceIndex":
+        """Copie de l'index limitée aux étapes antérieures à `step`."""
+        index = TraceIndex()
+
+        for line, steps in self.line_steps.items():
+            count = bisect_left(steps, step)
+            if count:
+                index.line_steps[line] = steps[:count]
+                index.size += count * ENTRY_BYTES
+
+        for name, steps in self.change_steps.items():
+            count = bisect_left(steps, step)
+            if count:
+                index.change_steps[name] = steps[:count]
+                index.changes[name] = self.changes[name][:count]
+                counted = None
+                for change_step, function_name, scope, value in index.changes[name]:
+                    index._last_values[(function_name, scope, name)] = value
+                    index.size += ENTRY_BYTES
+                    if counted != (change_step, id(value)):
+                        counted = (change_step, id(value))
+                        index.size += value_size(value)
+
+        # Les appels sont dans l'ordre des étapes ; ceux qui retournent après `step` redeviennent ouverts
+        for name, call_step, return_step, return_value in self.calls:
+            if call_step >= step:
+                break
+            if return_step is None or return_step >= step:
+                index._open_calls.append(len(index.calls))
+                index.calls.append((name, call_step, None, None))
+            else:
+                index.calls.append((name, call_step, return_step, return_value))
+                index.size += value_size(return_value)
+
+        return index
+
+    def steps_at_line(self, line: int, after: int = -1, limit: int = 100) -> Tuple[List[int], int]:
+        """Étapes passant par une ligne, strictement après `after`, et nombre total de passages."""
+        steps = self.line_steps.get(line, [])
+        start = bisect_right(steps, after)
+        return steps[start:start + limit], len(steps)
+
+    def variable_changes(self, name: str, after: int = -1, limit: int = 100) -> List[VariableChange]:
+        """Points de changement d'une variable, strictement après l'étape `after`."""
+        start = bisect_right(self.change_steps.get(name, []), after)
+        return [
+            VariableChange(step=step, function_name=function_name, scope=scope, value=value)
+            for step, function_name, scope, value in self.changes.get(name, [])[start:start + limit]
+        ]
+
+    def variable_names(self) -> List[str]:
+        """Noms des variables observées dans la trace."""
+        return sorted(self.changes)
+
+    def call_records(self, function_name: Optional[str] = None, limit: int = 100) -> List[CallRecord]:
+        """Paires appel/retour, éventuellement filtrées par fonction."""
+        records = []
+        for name, call_step, return_step, return_value in self.calls:
+            if function_name is not None and name != function_name:
+                continue
+            records.append(CallRecord(
+                function_name=name,
+                call_step=call_step,
+                return_step=return_step,
+                return_value=return_value
+            ))
+            if len(records) >= limit:
+                break
+        return records
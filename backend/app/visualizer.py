@@ -3,7 +3,7 @@ Module de visualisation pour générer des représentations graphiques du code.
 """
 
 from typing import Dict, Any, List
-from ..models import VisualizationData, VisualizationNode
+from .models import VisualizationData, VisualizationNode
 
 
 class CodeVisualizer:
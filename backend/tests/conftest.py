@@ -0,0 +1,14 @@
+import os
+
+# Les jobs sont exécutés localement, sans broker
+os.environ.setdefault("CELERY_TASK_ALWAYS_EAGER", "1")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
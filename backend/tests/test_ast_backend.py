@@ -0,0 +1,255 @@
+"""
+Parité du backend de traçage AST avec `sys.settrace` : les deux backends
+doivent produire les mêmes étapes (ligne, fonction, variables) sur ce corpus.
+Les différences connues sont décrites dans `app.executors.ast_instrumenter`.
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from app.executors.python_executor import PythonExecutor, PythonTracer
+
+CORPUS = {
+    "assignations": """x = 1
+y = x + 2
+x, y = y, x
+z: int = x * y
+del z
+""",
+    "fonctions": """def add(a, b=2, *args, c=3, **kwargs):
+    \"\"\"Somme.\"\"\"
+    total = a + b + c
+    return total
+
+r = add(1)
+s = add(1, 2, 3, c=4, d=5)
+""",
+    "retour_implicite": """def hello(name):
+    message = "hello " + name
+
+hello("world")
+""",
+    "recursion": """def factorial(n):
+    if n <= 1:
+        return 1
+    return n * factorial(n - 1)
+
+result = factorial(5)
+""",
+    "tri_a_bulles": """def bubble_sort(arr):
+    n = len(arr)
+    for i in range(n):
+        for j in range(0, n - i - 1):
+            if arr[j] > arr[j + 1]:
+                arr[j], arr[j + 1] = arr[j + 1], arr[j]
+    return arr
+
+numbers = [64, 34, 25, 12]
+sorted_numbers = bubble_sort(numbers.copy())
+print(sorted_numbers)
+""",
+    "boucles": """total = 0
+for i in range(3):
+    if i == 1:
+        continue
+    total += i
+else:
+    done = True
+k = 0
+while k < 3:
+    k += 1
+    if k == 2:
+        break
+""",
+    "exceptions": """def risky(v):
+    if v < 0:
+        raise ValueError("negatif")
+    return v
+
+try:
+    risky(-1)
+except ValueError as error:
+    message = str(error)
+finally:
+    cleanup = True
+""",
+    "global": """counter = 0
+
+def bump():
+    global counter
+    counter += 1
+
+bump()
+bump()
+""",
+    "fermetures": """def outer():
+    c = 0
+    def inc():
+        nonlocal c
+        c += 1
+        return c
+    def read():
+        def deep():
+            return c
+        return deep()
+    inc()
+    inc()
+    return read()
+
+r = outer()
+""",
+    "fermetures_retour": """def outer(flag):
+    c = 1
+    def change():
+        if flag:
+            nonlocal c
+            c = 5
+        return c
+    return change()
+
+r = outer(True)
+""",
+    "generateurs": """def countdown(n):
+    while n > 0:
+        yield n
+        n -= 1
+
+def echo():
+    received = yield "pret"
+    yield received
+
+values = list(countdown(3))
+e = echo()
+first = next(e)
+second = e.send("ok")
+""",
+    "walrus": """data = [1, 2, 3]
+if (n := len(data)) > 2:
+    big = True
+y = data or (z := 5)
+while (k := n) < 2:
+    n += 1
+""",
+    "match": """point = (1, 2)
+match point:
+    case (0, 0):
+        kind = "origine"
+    case (x, y):
+        kind = "point"
+""",
+    "classes": """class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def norm(self):
+        return abs(self.x) + abs(self.y)
+
+p = Point(3, -4)
+n = p.norm()
+""",
+    "entrees_sorties": """name = input()
+print("bonjour", name)
+""",
+    "mutations": """class Box:
+    pass
+
+def fill(items, box):
+    items.append(len(items))
+    box.size = len(items)
+
+items = []
+box = Box()
+table = {}
+limit = 3
+for i in range(limit):
+    fill(items, box)
+    table[i] = items[-1]
+    items[0] = -i
+limit = "fin"
+del fill
+""",
+}
+
+# Différences documentées : étapes de settrace absentes du backend AST
+KNOWN_DIFFERENCES = {
+    # Le corps de la classe n'est pas tracé, ses méthodes le sont
+    "classes": lambda step: step[1] == "Point",
+    # Les lignes `case` ne produisent pas d'étape
+    "match": lambda step: step[0] in (3, 5),
+    "mutations": lambda step: step[1] == "Box",
+}
+
+_ADDRESS = re.compile(r" at 0x[0-9a-f]+")
+
+
+def signature(steps):
+    """Ligne, fonction et variables de chaque étape, sans les adresses mémoire."""
+    def variables(items):
+        return sorted((variable.name, _ADDRESS.sub("", repr(variable.value))) for variable in items)
+
+    return [
+        (step.line, step.stack[0].function_name, variables(step.stack[0].locals), variables(step.stack[0].globals))
+        for step in steps
+    ]
+
+
+def trace(code, backend):
+    executor = PythonExecutor()
+    return asyncio.run(executor.execute_with_trace(code, input_data="Ada", tracer_backend=backend))
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_ast_backend_matches_settrace(name):
+    expected = trace(CORPUS[name], "settrace")
+    actual = trace(CORPUS[name], "ast")
+
+    assert actual.status == expected.status
+    assert actual.output == expected.output
+
+    expected_steps, actual_steps = signature(expected.steps), signature(actual.steps)
+    if name in KNOWN_DIFFERENCES:
+        expected_steps = [step for step in expected_steps if not KNOWN_DIFFERENCES[name](step)]
+    for position, (wanted, got) in enumerate(zip(expected_steps, actual_steps)):
+        assert got == wanted, f"première différence à l'étape {position}"
+    assert len(actual_steps) == len(expected_steps)
+
+
+def test_ast_backend_indexes_calls():
+    executor = PythonExecutor()
+    result = asyncio.run(executor.execute_with_trace(CORPUS["recursion"], tracer_backend="ast"))
+    calls = executor.get_trace_index(result.trace_id).call_records("factorial")
+    assert [call.return_value for call in calls] == [120, 24, 6, 2, 1]
+
+
+def test_ast_backend_formats_only_rebound_values(monkeypatch):
+    # Les valeurs immuables déjà formatées d'une frame sont réutilisées
+    # tant que la variable n'est pas réaffectée
+    code = """WIDTH = 80
+HEIGHT = 25
+TITLE = "grille"
+
+def area(w, h):
+    return w * h
+
+total = 0
+for i in range(200):
+    total += area(WIDTH, HEIGHT)
+"""
+    calls = []
+    format_value = PythonTracer.format_value
+
+    def counting_format_value(self, value):
+        calls.append(value)
+        return format_value(self, value)
+
+    monkeypatch.setattr(PythonTracer, "format_value", counting_format_value)
+    expected = trace(code, "settrace")
+    settrace_calls = len(calls)
+    calls.clear()
+    actual = trace(code, "ast")
+
+    assert signature(actual.steps) == signature(expected.steps)
+    assert len(calls) * 3 < settrace_calls
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import broadcast as broadcast_module
+from app.broadcast import CLOSED, DROPPED, BroadcastManager, BroadcastSession
+from app.main import app, broadcasts
+from app.models import ExecutionRequest
+
+
+def make_session():
+    return BroadcastSession(ExecutionRequest(code="x = 1", language="python"))
+
+
+def test_slow_subscriber_is_told_it_was_dropped(monkeypatch):
+    monkeypatch.setattr(broadcast_module, "SUBSCRIBER_QUEUE_SIZE", 2)
+    session = make_session()
+    queue = session.subscribe()
+
+    session.seek(1)
+    session.seek(2)
+
+    assert queue not in session.subscribers
+    assert queue.get_nowait() is DROPPED
+
+
+def test_close_reaches_full_queues(monkeypatch):
+    monkeypatch.setattr(broadcast_module, "SUBSCRIBER_QUEUE_SIZE", 1)
+    session = make_session()
+    queue = session.subscribe()
+
+    session.close()
+
+    assert queue.get_nowait() is CLOSED
+
+
+def test_dropped_viewer_socket_is_closed(client):
+    created = client.post("/api/broadcasts", json={"code": "x = 1", "language": "python"}).json()
+    session = broadcasts.get(created["broadcast_id"])
+
+    def drop_all():
+        for queue in list(session.subscribers):
+            session.subscribers.discard(queue)
+            broadcast_module._terminate(queue, DROPPED)
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/api/broadcasts/{created['broadcast_id']}/ws") as websocket:
+            assert websocket.receive_json()["type"] == "snapshot"
+            # Exécuté dans la boucle de l'application, comme publish()
+            websocket.portal.call(_run_sync, drop_all)
+            while True:
+                websocket.receive_json()
+    assert closed.value.code == 1013
+
+
+async def _run_sync(function):
+    function()
+
+
+LONG_PROGRAM = "total = 0\nfor i in range(1000):\n    total += i\n"
+
+
+async def _consume(queue, received):
+    """Spectateur en bonne santé : lit chaque trame dès qu'elle est publiée."""
+    while True:
+        message = await queue.get()
+        if message is CLOSED or message is DROPPED:
+            received.append(message)
+            return
+        received.append(json.loads(message))
+        if received[-1]["type"] == "status":
+            return
+
+
+def test_long_trace_is_streamed_to_attached_viewers():
+    async def scenario():
+        manager = BroadcastManager()
+        session = manager.create(ExecutionRequest(code=LONG_PROGRAM, language="python"))
+        received = []
+        viewer = asyncio.create_task(_consume(session.subscribe(), received))
+        await manager.run(session)
+        await asyncio.wait_for(viewer, timeout=5)
+        return session, received
+
+    session, received = asyncio.run(scenario())
+
+    steps = [message for message in received if message["type"] == "step"]
+    assert len(session.frames) > broadcast_module.SUBSCRIBER_QUEUE_SIZE
+    assert len(steps) == len(session.frames)
+    assert received[-1]["type"] == "status"
+
+
+def test_stalled_viewer_is_dropped_without_stopping_the_stream(monkeypatch):
+    monkeypatch.setattr(broadcast_module, "SLOW_VIEWER_TIMEOUT", 0.05)
+
+    async def scenario():
+        manager = BroadcastManager()
+        session = manager.create(ExecutionRequest(code=LONG_PROGRAM, language="python"))
+        stalled = session.subscribe()
+        received = []
+        viewer = asyncio.create_task(_consume(session.subscribe(), received))
+        await manager.run(session)
+        await asyncio.wait_for(viewer, timeout=5)
+        return session, stalled, received
+
+    session, stalled, received = asyncio.run(scenario())
+
+    assert stalled not in session.subscribers
+    assert stalled.get_nowait() is DROPPED
+    assert len([message for message in received if message["type"] == "step"]) == len(session.frames)
+
+
+def test_websocket_viewer_receives_long_trace(monkeypatch):
+    run_execution = broadcast_module.run_execution
+
+    async def after_first_viewer(request):
+        # L'exécution attend le spectateur, pour qu'il reçoive le flux et non l'instantané
+        while not any(session.subscribers for session in broadcasts.sessions.values()):
+            await asyncio.sleep(0.01)
+        return await run_execution(request)
+
+    monkeypatch.setattr(broadcast_module, "run_execution", after_first_viewer)
+
+    # Une seule boucle d'événements pour la requête et le WebSocket : la diffusion y tourne
+    with TestClient(app) as client:
+        created = client.post("/api/broadcasts", json={"code": LONG_PROGRAM, "language": "python"}).json()
+        with client.websocket_connect(f"/api/broadcasts/{created['broadcast_id']}/ws") as websocket:
+            assert websocket.receive_json()["frames"] == []
+            steps = 0
+            while (message := websocket.receive_json())["type"] == "step":
+                steps += 1
+
+    assert message["type"] == "status"
+    assert steps == len(broadcasts.get(created["broadcast_id"]).frames) > broadcast_module.SUBSCRIBER_QUEUE_SIZE
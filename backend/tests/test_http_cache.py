@@ -0,0 +1,50 @@
+import pytest
+
+from app import http_cache
+from app.http_cache import negotiate_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=abc", "gzip"),
+    ("gzip;q=0.5;level=1", "gzip"),
+    ("gzip; q=0", None),
+    ("*;q=0.2", "gzip"),
+    ("gzip;q=0, *", None),
+])
+def test_negotiate_encoding_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_honours_quality_order(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", object())
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("br;q=0, *") == "gzip"
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip;q=abc", "gzip;q=0.5;level=1"])
+def test_malformed_accept_encoding_is_tolerated(client, accept_encoding):
+    response = client.get("/api/languages", headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_static_payload_revalidates_with_etag(client):
+    etag = client.get("/api/languages").headers["ETag"]
+    response = client.get("/api/languages", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_execute_is_not_conditional(client):
+    response = client.post(
+        "/api/execute",
+        json={"code": "x = 1", "language": "python"},
+        headers={"If-None-Match": "*"}
+    )
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.json()["status"] == "completed"
@@ -0,0 +1,142 @@
+"""
+Mode incrémental : une exécution reprise à un point de contrôle doit produire
+la même sortie et les mêmes étapes qu'une exécution complète du même code.
+"""
+
+import asyncio
+
+import pytest
+
+from app.executors import python_executor
+from app.executors.python_executor import PythonExecutor
+
+from .test_ast_backend import signature
+
+# Le préfixe coûteux rend les points de contrôle avantageux à la reprise
+PREFIX = "import time\ntime.sleep(0.05)\n"
+
+# Programme initial et programme modifié : l'état partagé modifié par le préfixe commun doit être restauré
+EDITS = {
+    "attribut_de_classe": (
+        "class C:\n    n = 0\nC.n += 1\nC.n += 1\nprint(C.n)\n",
+        "class C:\n    n = 0\nC.n += 1\nC.n += 5\nprint(C.n)\n",
+    ),
+    "graine_aleatoire": (
+        "import random\nrandom.seed(1)\na = random.random()\nb = random.random()\nprint(a)\n",
+        "import random\nrandom.seed(1)\na = random.random()\nc = random.random()\nprint(c)\n",
+    ),
+    "valeur_par_defaut_mutable": (
+        "def f(acc=[]):\n    acc.append(1)\n    return len(acc)\nf()\nprint(f())\n",
+        "def f(acc=[]):\n    acc.append(1)\n    return len(acc)\nf()\nprint(f(), 'fin')\n",
+    ),
+    "attribut_de_fonction": (
+        "def f():\n    f.calls += 1\nf.calls = 0\nf()\nf()\nprint(f.calls)\n",
+        "def f():\n    f.calls += 1\nf.calls = 0\nf()\nprint('appels', f.calls)\n",
+    ),
+    "fermeture": (
+        "def counter():\n    c = 0\n    def inc():\n        nonlocal c\n        c += 1\n        return c\n"
+        "    return inc\ninc = counter()\ninc()\nprint(inc())\n",
+        "def counter():\n    c = 0\n    def inc():\n        nonlocal c\n        c += 1\n        return c\n"
+        "    return inc\ninc = counter()\ninc()\nprint(inc(), inc())\n",
+    ),
+    "liste_partagee": (
+        "a = [1, 2]\nb = a\na.append(3)\nb.append(4)\nprint(a, b)\n",
+        "a = [1, 2]\nb = a\na.append(3)\nb.append(5)\nprint(a is b, a)\n",
+    ),
+    "objets": (
+        "class P:\n    def __init__(self):\n        self.items = []\np = P()\np.items.append(1)\nq = p\nprint(q.items)\n",
+        "class P:\n    def __init__(self):\n        self.items = []\np = P()\np.items.append(1)\nq = p\nq.items.append(2)\n",
+    ),
+}
+
+
+@pytest.fixture
+def checkpoint_everywhere(monkeypatch):
+    """Un point de contrôle après chaque instruction, pour tester la restauration à chaque position."""
+    monkeypatch.setattr(python_executor, "CHECKPOINT_MIN_INTERVAL", 0)
+    monkeypatch.setattr(python_executor, "CHECKPOINT_COST_RATIO", 0)
+
+
+def run(executor, code, session_id="session"):
+    return asyncio.run(executor.execute_incremental(code, session_id))
+
+
+@pytest.mark.parametrize("name", sorted(EDITS))
+def test_resumed_run_matches_fresh_run(name, checkpoint_everywhere):
+    first, edited = (PREFIX + code for code in EDITS[name])
+    executor = PythonExecutor()
+    run(executor, first)
+    resumed = run(executor, edited)
+    fresh = run(PythonExecutor(), edited)
+
+    assert resumed.resumed_steps > 0
+    assert resumed.status == fresh.status == "completed"
+    assert resumed.output == fresh.output
+    assert signature(resumed.steps) == signature(fresh.steps)
+
+
+def test_unchanged_code_is_resumed_before_last_statement(checkpoint_everywhere):
+    code = PREFIX + "total = 0\nfor i in range(5):\n    total += i\nprint(total)\n"
+    executor = PythonExecutor()
+    first = run(executor, code)
+    again = run(executor, code)
+
+    assert again.resumed_steps > 0
+    assert again.output == first.output == ["10"]
+    assert signature(again.steps) == signature(first.steps)
+
+
+def test_no_checkpoint_after_module_mutation(checkpoint_everywhere):
+    code = PREFIX + "import math\nmath.tau = 1\nx = 1\nprint(x)\n"
+    executor = PythonExecutor()
+    try:
+        run(executor, code)
+        session = executor.incremental_sessions["session"]
+        assert [checkpoint.statement_count for checkpoint in session.checkpoints] == [1, 2, 3]
+    finally:
+        import math
+        math.tau = 2 * math.pi
+
+
+def test_checkpoints_are_spaced_by_execution_time():
+    # Des instructions rapides ne justifient pas le coût d'une copie de l'état :
+    # deux points de contrôle sont séparés d'au moins CHECKPOINT_MIN_INTERVAL
+    code = "".join(f"x{i} = {i}\n" for i in range(30))
+    executor = PythonExecutor()
+    run(executor, code)
+
+    elapsed = [checkpoint.elapsed for checkpoint in executor.incremental_sessions["session"].checkpoints]
+    assert all(later - earlier >= python_executor.CHECKPOINT_MIN_INTERVAL
+               for earlier, later in zip([0.0] + elapsed, elapsed))
+
+
+def test_future_imports_apply_to_every_statement(checkpoint_everywhere):
+    # Chaque instruction est compilée séparément : les imports `__future__` doivent la suivre
+    code = (
+        "from __future__ import annotations\nimport time\ntime.sleep(0.05)\n"
+        "def f(a: Undefined) -> Missing:\n    return a\nprint(f(1), f.__annotations__)\n"
+    )
+    executor = PythonExecutor()
+    first = run(executor, code)
+    resumed = run(executor, code.replace("f(1)", "f(2)"))
+
+    assert first.status == resumed.status == "completed"
+    assert first.output == ["1 {'a': 'Undefined', 'return': 'Missing'}"]
+    assert resumed.resumed_steps > 0
+    assert resumed.output == ["2 {'a': 'Undefined', 'return': 'Missing'}"]
+
+
+def test_sessions_are_evicted_by_memory(checkpoint_everywhere):
+    executor = PythonExecutor()
+    code = PREFIX + "data = list(range(1000))\nprint(len(data))\n"
+    run(executor, code, "a")
+    size = executor.incremental_sessions["a"].size
+    assert size > 0
+
+    executor.max_incremental_bytes = size + size // 2
+    run(executor, code, "b")
+    assert list(executor.incremental_sessions) == ["b"]
+
+    executor.max_incremental_bytes = size // 2
+    run(executor, code, "c")
+    assert "c" not in executor.incremental_sessions
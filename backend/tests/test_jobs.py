@@ -0,0 +1,68 @@
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+from starlette.websockets import WebSocketDisconnect
+
+from app import execution, jobs
+from app.models import JobState
+
+
+def test_submitted_job_completes(client):
+    response = client.post("/api/jobs", json={"code": "x = 1\nprint(x)", "language": "python"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/api/jobs/{job_id}").json()
+    assert status["status"] == "completed"
+    assert status["result"]["final_output"] == ["1"]
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_unknown_job_websocket_is_closed(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/jobs/unknown/ws") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 4404
+
+
+def test_job_websocket_pushes_final_state(client):
+    job_id = client.post("/api/jobs", json={"code": "x = 1", "language": "python"}).json()["job_id"]
+    with client.websocket_connect(f"/api/jobs/{job_id}/ws") as websocket:
+        assert '"completed"' in websocket.receive_text()
+
+
+def test_replay_mode_is_rejected_for_jobs(client):
+    response = client.post("/api/jobs", json={"code": "x = 1", "language": "python", "trace_mode": "replay"})
+    assert response.status_code == 400
+
+
+def test_job_is_sent_with_time_limits(client, monkeypatch):
+    sent = {}
+    monkeypatch.setattr(jobs.execute_job, "apply_async", lambda **options: sent.update(options))
+    client.post("/api/jobs", json={"code": "while True: pass", "language": "python", "timeout": 7})
+
+    assert sent["soft_time_limit"] == 7
+    assert sent["time_limit"] == 7 + jobs.JOB_TIME_LIMIT_GRACE
+
+
+def test_job_over_time_limit_fails(client, monkeypatch):
+    async def interrupted(request):
+        raise SoftTimeLimitExceeded()
+
+    monkeypatch.setattr(execution, "run_execution", interrupted)
+    job_id = client.post("/api/jobs", json={"code": "while True: pass", "language": "python", "timeout": 7}).json()["job_id"]
+
+    status = client.get(f"/api/jobs/{job_id}").json()
+    assert status["status"] == "failed"
+    assert status["error"] == "Temps d'exécution dépassé (7 s)"
+
+
+def test_job_killed_at_hard_limit_fails():
+    job_id = "killed"
+    jobs.celery_app.backend.mark_as_failure(job_id, TimeLimitExceeded(12))
+
+    status = jobs.get_job_status(job_id)
+    assert status.status == JobState.FAILED
+    assert status.error == jobs.TIMEOUT_MESSAGE
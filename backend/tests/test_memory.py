@@ -0,0 +1,68 @@
+"""
+Mesure mémoire en mode 'full' : les échantillons par étape comptent les
+allocations du programme, sans la mémoire retenue par le traceur, et sans
+instantané tracemalloc à chaque étape.
+"""
+
+import asyncio
+import tracemalloc
+
+import pytest
+
+from app.executors.python_executor import PythonExecutor
+
+BUFFER = """buffer = bytearray(1_000_000)
+size = len(buffer)
+del buffer
+done = True
+"""
+
+
+def trace(code, memory_interval=1):
+    result = asyncio.run(PythonExecutor().execute_with_trace(code, memory_interval=memory_interval))
+    assert result.status == "completed"
+    return result
+
+
+def allocated_at(result, line):
+    return [step.memory.allocated_bytes for step in result.steps if step.line == line and step.memory]
+
+
+def test_samples_follow_program_allocations():
+    result = trace(BUFFER)
+
+    # Étape de la ligne 2 : le tampon vient d'être alloué ; ligne 4 : il a été libéré
+    assert 1_000_000 <= allocated_at(result, 2)[0] < 1_010_000
+    assert allocated_at(result, 4)[0] < 10_000
+    assert result.memory.peak_bytes >= 1_000_000
+
+
+def test_tracer_memory_is_not_counted():
+    # Des milliers d'étapes retenues par le traceur, aucune allocation durable du programme
+    result = trace("total = 0\nfor _ in [0] * 2000:\n    total = 1\n")
+
+    # Seule la liste parcourue (16 ko) est allouée par le programme ; les étapes pèsent des Mo
+    assert len(result.steps) > 4000
+    assert max(step.memory.allocated_bytes for step in result.steps) < 20_000
+    assert result.memory.peak_bytes < 20_000
+
+
+def test_allocation_sites_are_reported():
+    result = trace("data = [str(i) * 100 for i in range(1000)]\nn = len(data)\n")
+
+    site = result.memory.top_allocations[0]
+    assert site.line == 1
+    assert site.size_bytes >= 100_000
+    assert allocated_at(result, 2)[0] >= 100_000
+
+
+@pytest.mark.parametrize("memory_interval", [1, 10])
+def test_single_snapshot_per_run(monkeypatch, memory_interval):
+    snapshots = []
+    take_snapshot = tracemalloc.take_snapshot
+    monkeypatch.setattr(tracemalloc, "take_snapshot", lambda: snapshots.append(1) or take_snapshot())
+
+    result = trace("total = 0\nfor i in range(500):\n    total += i\n", memory_interval)
+
+    assert result.memory.samples == len(range(0, len(result.steps), memory_interval)) + 1
+    assert len(snapshots) == 1
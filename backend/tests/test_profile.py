@@ -0,0 +1,141 @@
+"""
+Mode profile : profil par ligne et par fonction du code Python (traceur) et
+du code C (gcov et gprof).
+"""
+
+import asyncio
+import shutil
+
+import pytest
+
+from app.executors.c_executor import CExecutor, parse_gprof_call_graph
+from app.executors.python_executor import PythonExecutor
+
+RECURSION = """import time
+
+def factorial(n):
+    if n <= 1:
+        time.sleep(0.02)
+        return 1
+    return n * factorial(n - 1)
+
+result = factorial(5)
+print(result)
+"""
+
+# Sortie de `gprof -b -q` pour fib(38) récursif et square appelé 25 fois par main
+GPROF_SAMPLE = """\t\t\tCall graph
+
+
+granularity: each sample hit covers 2 byte(s) for 11.09% of 0.09 seconds
+
+index % time    self  children    called     name
+                                                 <spontaneous>
+[1]     55.6    0.05    0.00                 frame_dummy [1]
+-----------------------------------------------
+                             126491970             fib [2]
+                0.04    0.00       1/1           main [3]
+[2]     44.4    0.04    0.00       1+126491970 fib [2]
+                             126491970             fib [2]
+-----------------------------------------------
+                                                 <spontaneous>
+[3]     44.4    0.00    0.04                 main [3]
+                0.04    0.00       1/1           fib [2]
+                0.00    0.00      25/25          square [4]
+-----------------------------------------------
+                0.00    0.00      25/25          main [3]
+[4]      0.0    0.00    0.00      25         square [4]
+-----------------------------------------------
+
+Index by function name
+
+   [2] fib                     [1] frame_dummy             [4] square
+"""
+
+C_PROGRAM = """#include <stdio.h>
+int square(int x) { return x * x; }
+int main(void) {
+    int total = 0;
+    for (int i = 0; i < 25; i++)
+        total += square(i);
+    printf("%d\\n", total);
+    return 0;
+}
+"""
+
+
+def python_profile(code):
+    result = asyncio.run(PythonExecutor().execute_with_trace(code, trace_mode="profile"))
+    assert result.status == "completed"
+    return result.profile
+
+
+def test_python_line_hits_and_times():
+    profile = python_profile(RECURSION)
+    lines = {line.line: line for line in profile.lines}
+
+    assert lines[4].hits == 5
+    assert lines[5].hits == 1
+    assert lines[7].hits == 4
+    assert lines[9].hits == 1
+    # Le temps cumulé d'une ligne inclut ses appels, pas son temps propre
+    assert lines[5].self_time >= 0.02
+    assert lines[9].total_time >= 0.02 > lines[9].self_time
+    assert all(line.self_time <= line.total_time + 1e-6 for line in profile.lines)
+
+
+def test_python_recursive_function_total_is_counted_once():
+    profile = python_profile(RECURSION)
+    functions = {function.function_name: function for function in profile.functions}
+    lines = {line.line: line for line in profile.lines}
+
+    factorial = functions["factorial"]
+    assert factorial.calls == 5
+    # Compté à chaque niveau de récursion, le total dépasserait celui de la ligne d'appel
+    assert 0.02 <= factorial.total_time <= lines[9].total_time
+    assert factorial.self_time <= factorial.total_time
+
+
+def test_python_call_edges():
+    profile = python_profile(RECURSION)
+    edges = {(edge.caller, edge.callee): edge.calls for edge in profile.call_edges}
+
+    assert edges == {("<module>", "factorial"): 1, ("factorial", "factorial"): 4}
+
+
+def test_gprof_call_graph_is_parsed():
+    functions, call_edges, total_time = parse_gprof_call_graph(GPROF_SAMPLE)
+
+    assert functions == {
+        "frame_dummy": (0.05, 0.05),
+        "fib": (0.04, 0.04),
+        "main": (0.04, 0.0),
+        "square": (0.0, 0.0),
+    }
+    assert {(edge.caller, edge.callee): edge.calls for edge in call_edges} == {
+        ("fib", "fib"): 126491970,
+        ("main", "fib"): 1,
+        ("main", "square"): 25,
+    }
+    # Somme des temps propres : les 0.09 s annoncées par gprof
+    assert total_time == pytest.approx(0.09)
+
+
+@pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("gcc", "gcov", "gprof")),
+    reason="gcc, gcov et gprof sont nécessaires"
+)
+def test_c_profile():
+    result = asyncio.run(CExecutor().execute_with_trace(C_PROGRAM, trace_mode="profile"))
+
+    assert result.status == "completed"
+    assert result.output == ["4900"]
+    lines = {line.line: line.hits for line in result.profile.lines}
+    assert lines[2] == 25
+    assert lines[6] == 25
+    functions = {function.function_name: function.calls for function in result.profile.functions}
+    assert functions == {"square": 25, "main": 1}
+    assert any(
+        (edge.caller, edge.callee, edge.calls) == ("main", "square", 25)
+        for edge in result.profile.call_edges
+    )
@@ -0,0 +1,92 @@
+"""
+Mode replay : les étapes matérialisées à la demande doivent correspondre aux
+lignes enregistrées et rejouer à l'identique l'entrée, `random` et `time`.
+"""
+
+from app.execution import executors
+
+from .test_ast_backend import _ADDRESS
+
+PROGRAM = """import random
+import time
+
+def roll(n):
+    values = []
+    for _ in range(n):
+        values.append(random.randint(1, 100))
+    return values
+
+name = input()
+started = time.time()
+rolls = roll(5)
+elapsed = time.perf_counter()
+print(name, rolls, started, elapsed)
+"""
+
+
+def record(client, code=PROGRAM, input_data="Ada"):
+    response = client.post(
+        "/api/execute",
+        json={"code": code, "language": "python", "input_data": input_data, "trace_mode": "replay"},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def materialize(client, trace_id, start, count):
+    response = client.get(f"/api/traces/{trace_id}/steps", params={"start": start, "count": count})
+    assert response.status_code == 200
+    return response.json()["steps"]
+
+
+def globals_at(step):
+    return {variable["name"]: _ADDRESS.sub("", str(variable["value"])) for variable in step["stack"][0]["globals"]}
+
+
+def test_materialized_steps_match_recorded_lines(client):
+    recorded = record(client)
+    lines = recorded["step_lines"]
+    assert recorded["total_steps"] == len(lines) > 1
+
+    steps = []
+    for start in range(0, len(lines), 7):
+        steps.extend(materialize(client, recorded["trace_id"], start, 7))
+
+    assert [step["step"] for step in steps] == list(range(len(lines)))
+    assert [step["line"] for step in steps] == lines
+
+
+def test_replay_reproduces_input_random_and_time(client):
+    recorded = record(client)
+    last = len(recorded["step_lines"]) - 1
+
+    session = executors["python"].replay_sessions[recorded["trace_id"]]
+
+    # Trois ré-exécutions indépendantes, dans le désordre
+    final = globals_at(materialize(client, recorded["trace_id"], last, 1)[0])
+    session.cache.clear()
+    middle = materialize(client, recorded["trace_id"], last // 2, 1)[0]
+    session.cache.clear()
+    again = globals_at(materialize(client, recorded["trace_id"], last, 1)[0])
+
+    assert final == again
+    assert final["name"] == "Ada"
+    assert recorded["final_output"] == [f"Ada {final['rolls']} {final['started']} {final['elapsed']}"]
+    assert middle["line"] == recorded["step_lines"][last // 2]
+
+
+def test_replay_matches_full_trace_for_deterministic_code(client):
+    code = "def square(x):\n    return x * x\n\ntotal = 0\nfor i in range(4):\n    total += square(i)\n"
+    recorded = record(client, code)
+    full = client.post("/api/execute", json={"code": code, "language": "python"}).json()
+
+    steps = materialize(client, recorded["trace_id"], 0, len(recorded["step_lines"]))
+    assert len(steps) == full["total_steps"]
+    assert [(step["line"], globals_at(step)) for step in steps] == \
+        [(step["line"], globals_at(step)) for step in full["steps"]]
+
+
+def test_out_of_range_step_is_not_found(client):
+    recorded = record(client)
+    response = client.get(f"/api/traces/{recorded['trace_id']}/steps", params={"start": len(recorded["step_lines"])})
+    assert response.status_code == 404
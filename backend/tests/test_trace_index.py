@@ -0,0 +1,70 @@
+import asyncio
+
+from app.executors.python_executor import PythonExecutor
+
+LOOP = "total = 0\nfor i in range(50):\n    total += i\n"
+
+
+def run(executor, code):
+    return asyncio.run(executor.execute_with_trace(code))
+
+
+def test_index_answers_line_and_variable_queries():
+    executor = PythonExecutor()
+    result = run(executor, LOOP)
+    index = executor.get_trace_index(result.trace_id)
+
+    steps, total_hits = index.steps_at_line(3)
+    assert total_hits == 50
+    assert [result.steps[step].line for step in steps] == [3] * 50
+    changes = [change for change in index.variable_changes("total") if change.scope == "global"]
+    assert [change.value for change in changes][:3] == [0, 1, 3]
+    assert len(changes) == 50
+
+
+def test_indexes_are_evicted_by_total_size():
+    executor = PythonExecutor()
+    result = run(executor, LOOP)
+    size = executor.get_trace_index(result.trace_id).size
+
+    executor = PythonExecutor(max_trace_index_bytes=size * 2)
+    trace_ids = [run(executor, LOOP).trace_id for _ in range(3)]
+    assert list(executor.trace_indexes) == trace_ids[1:]
+
+
+def test_oversized_index_is_not_kept():
+    executor = PythonExecutor(max_trace_index_bytes=1000)
+    result = run(executor, LOOP)
+    assert result.trace_id is None
+    assert not executor.trace_indexes
+
+
+def test_job_results_have_no_trace_id(client):
+    job_id = client.post("/api/jobs", json={"code": "x = 1", "language": "python"}).json()["job_id"]
+    assert client.get(f"/api/jobs/{job_id}").json()["result"]["trace_id"] is None
+
+
+def test_index_size_counts_stored_values():
+    code = "s = ''\nfor i in range(400):\n    s += 'x' * 2000\n"
+    executor = PythonExecutor(max_trace_index_bytes=1024 ** 3)
+    index = executor.get_trace_index(run(executor, code).trace_id)
+
+    # Chaque valeur de `s` est conservée en entier : environ 160 Mo
+    assert index.size > sum(2000 * n for n in range(1, 401))
+
+    # La limite par défaut ne conserve pas un tel index
+    assert run(PythonExecutor(), code).trace_id is None
+
+
+def test_indexes_with_large_values_are_evicted():
+    code = "s = ''\nfor i in range(100):\n    s += 'x' * 2000\n"
+    executor = PythonExecutor()
+    size = executor.get_trace_index(run(executor, code).trace_id).size
+    assert size > sum(2000 * n for n in range(1, 101))
+
+    executor = PythonExecutor(max_trace_index_bytes=size * 3 // 2)
+    run(executor, code)
+
+    second = run(executor, code).trace_id
+    assert list(executor.trace_indexes) == [second]
+    assert sum(index.size for index in executor.trace_indexes.values()) <= executor.max_trace_index_bytes
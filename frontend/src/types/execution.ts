@@ -19,6 +19,7 @@ export interface ExecutionStep {
   heap: Record<string, any>
   output: string[]
   error?: string
+  memory?: { allocated_bytes: number; peak_bytes: number }
 }
 
 export interface ExecutionState {
@@ -30,6 +31,39 @@ export interface ExecutionState {
   status: 'running' | 'completed' | 'error'
   final_output: string[]
   execution_time: number
+  trace_id?: string
+  step_lines?: number[]
+  profile?: ProfileData
+  memory?: MemoryReport
+  resumed_steps?: number
+}
+
+export interface MemoryReport {
+  final_bytes: number
+  peak_bytes: number
+  samples: number
+  top_allocations: { line: number; size_bytes: number; count: number }[]
+}
+
+export interface LineProfile {
+  line: number
+  hits: number
+  total_time?: number
+  self_time?: number
+}
+
+export interface FunctionProfile {
+  function_name: string
+  calls: number
+  total_time?: number
+  self_time?: number
+}
+
+export interface ProfileData {
+  lines: LineProfile[]
+  functions: FunctionProfile[]
+  call_edges: { caller: string; callee: string; calls: number }[]
+  total_time: number
 }
 
 export interface CodePosition {